@@ -1,5 +1,15 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import create_sqlite_search_tables
+
+        post_migrate.connect(
+            create_sqlite_search_tables,
+            sender=apps.get_app_config('reviews')
+        )
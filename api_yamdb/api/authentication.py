@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import YaUser
+
+CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser')
+CLAIMS_KEY = 'auth-claims:{}'
+
+
+def user_claims(user):
+    # Read from __dict__, a deferred field must not cost a query here.
+    return {field: user.__dict__.get(field) for field in CLAIM_FIELDS}
+
+
+def claims_user(user_id, claims):
+    """An active YaUser with only the claim fields loaded.
+
+    Any other field is fetched from the database on first access.
+    """
+    loaded = dict(claims, id=user_id, is_active=True)
+    # from_db() expects the values in the order of the model fields.
+    fields = [
+        field.attname for field in YaUser._meta.concrete_fields
+        if field.attname in loaded
+    ]
+    return YaUser.from_db(
+        router.db_for_read(YaUser),
+        fields,
+        [loaded[field] for field in fields]
+    )
+
+
+def full_user(user):
+    """The user with every field loaded, for views that need the row."""
+    if not user.get_deferred_fields():
+        return user
+    return YaUser.objects.get(pk=user.pk)
+
+
+def store_claims(user_id, claims):
+    """Record the claims the user has now, None for no access at all."""
+    cache.set(
+        CLAIMS_KEY.format(user_id), claims or {},
+        settings.AUTH_TOKEN_CACHE_TTL
+    )
+    token_cache.evict_user(user_id)
+
+
+def current_claims(user_id):
+    """The claims of an active user as of now, None for any other.
+
+    Read from the cache, or from the database when the entry is missing:
+    evicted, expired or lost with a cache restart, it never lets a token
+    through. add() does not overwrite what store_claims() has just set.
+    """
+    key = CLAIMS_KEY.format(user_id)
+    claims = cache.get(key)
+    if claims is None:
+        claims = YaUser.objects.filter(pk=user_id, is_active=True).values(
+            *CLAIM_FIELDS
+        ).first() or {}
+        cache.add(key, claims, settings.AUTH_TOKEN_CACHE_TTL)
+    return claims or None
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access token carrying the fields the permission classes check."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field, value in user_claims(user).items():
+            token[field] = value
+        return token
+
+
+class TokenCache:
+    """Thread-safe LRU of verified tokens, each kept for at most ttl."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self.lock:
+            entry = self.entries.get(raw_token)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[raw_token]
+                return None
+            self.entries.move_to_end(raw_token)
+            return entry[1:]
+
+    def set(self, raw_token, validated_token, user_id, claims):
+        expires = min(time.time() + self.ttl, validated_token['exp'])
+        with self.lock:
+            self.entries[raw_token] = (
+                expires, validated_token, user_id, claims
+            )
+            self.entries.move_to_end(raw_token)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def evict_user(self, user_id):
+        with self.lock:
+            for raw_token in [
+                raw_token for raw_token, entry in self.entries.items()
+                if entry[2] == user_id
+            ]:
+                del self.entries[raw_token]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that does not read the user row.
+
+    The user is built from the claims of ClaimsAccessToken when they
+    match current_claims(), kept in the shared cache for at most
+    AUTH_TOKEN_CACHE_TTL seconds and rewritten on every change. Tokens
+    without the claims, or with claims that no longer match, are checked
+    against the database as before. Verified tokens are kept in an LRU
+    for AUTH_TOKEN_CACHE_TTL seconds. Without a cache shared by every
+    process the others would not see a change, so the user is always
+    read from the database then.
+    """
+
+    def authenticate(self, request):
+        if not settings.CACHE_SHARED:
+            return super().authenticate(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        cached = token_cache.get(raw_token)
+        if cached is not None:
+            validated_token, user_id, claims = cached
+            if current_claims(user_id) == claims:
+                return claims_user(user_id, claims), validated_token
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+        token_cache.set(raw_token, validated_token, user.pk, user_claims(user))
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+        if not settings.CACHE_SHARED or any(
+            field not in validated_token for field in CLAIM_FIELDS
+        ):
+            return super().get_user(validated_token)
+        claims = {field: validated_token[field] for field in CLAIM_FIELDS}
+        if current_claims(user_id) != claims:
+            return super().get_user(validated_token)
+        return claims_user(user_id, claims)
@@ -0,0 +1,200 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import prefetch_related_objects
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from .cache import invalidate
+
+
+class BatchedSlugRelatedField(serializers.SlugRelatedField):
+    """Slug field that takes its objects from a batch resolved up front.
+
+    BulkListSerializer fetches the objects of every slug of the payload
+    with one query; outside of a batch the field queries as usual.
+    """
+
+    def batch_key(self):
+        return (self.get_queryset().model, self.slug_field)
+
+    def to_internal_value(self, data):
+        resolved = self.context.get('resolved_slugs', {}).get(
+            self.batch_key()
+        )
+        if resolved is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, (str, int)):
+            self.fail('invalid')
+        try:
+            return resolved[str(data)]
+        except KeyError:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Validates and inserts a list of items as one batch.
+
+    Slugs are resolved with one query per related model and unique fields
+    are checked with one query per field, for the whole batch. Errors are
+    reported per item, in the order of the payload. The items are saved
+    with bulk_create() and their many to many rows with one more insert
+    per relation, all in one transaction. An empty list is an error.
+    """
+    default_error_messages = {
+        'empty': 'Список не может быть пустым.',
+    }
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
+
+    def slug_fields(self):
+        for field in self.child.fields.values():
+            many = isinstance(field, ManyRelatedField)
+            relation = field.child_relation if many else field
+            if not field.read_only and isinstance(
+                relation, BatchedSlugRelatedField
+            ):
+                yield field.field_name, relation, many
+
+    def resolve_slugs(self, data):
+        resolved = {}
+        for name, field, many in self.slug_fields():
+            slugs = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if many and isinstance(value, list) else [
+                    value
+                ]
+                slugs.update(
+                    str(slug) for slug in values
+                    if isinstance(slug, (str, int))
+                )
+            resolved.setdefault(field.batch_key(), {}).update(
+                (str(getattr(obj, field.slug_field)), obj)
+                for obj in field.get_queryset().filter(**{
+                    f'{field.slug_field}__in': slugs
+                })
+            )
+        self.context['resolved_slugs'] = resolved
+
+    def detach_unique_validators(self):
+        """Take the per item unique checks off the child fields."""
+        unique = {}
+        for name, field in self.child.fields.items():
+            validators = [
+                validator for validator in field.validators
+                if isinstance(validator, UniqueValidator)
+            ]
+            if validators:
+                unique[field.source] = validators[0].message
+                field.validators = [
+                    validator for validator in field.validators
+                    if validator not in validators
+                ]
+        return unique
+
+    def check_unique(self, unique, items, errors):
+        model = self.child.Meta.model
+        for source, message in unique.items():
+            values = [
+                item[source] for item in items if item and source in item
+            ]
+            taken = set(model._default_manager.filter(**{
+                f'{source}__in': values
+            }).values_list(source, flat=True))
+            for number, item in enumerate(items):
+                if not item or source not in item:
+                    continue
+                if item[source] in taken:
+                    errors[number].setdefault(source, []).append(
+                        str(message)
+                    )
+                    items[number] = None
+                taken.add(item[source])
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+        if len(data) > settings.BULK_CREATE_MAX_ITEMS:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Не больше {settings.BULK_CREATE_MAX_ITEMS} '
+                    f'элементов за один запрос.'
+                ]
+            })
+        self.resolve_slugs(data)
+        unique = self.detach_unique_validators()
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+        self.check_unique(unique, items, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        relations = {
+            field.source: model._meta.get_field(field.source)
+            for field in self.child.fields.values()
+            if isinstance(field, ManyRelatedField) and not field.read_only
+        }
+        instances = [
+            model(**{
+                name: value for name, value in item.items()
+                if name not in relations
+            })
+            for item in validated_data
+        ]
+        using = router.db_for_write(model)
+        with transaction.atomic(using=using):
+            insert(model, instances, using)
+            for name, relation in relations.items():
+                relation.remote_field.through._default_manager.bulk_create([
+                    relation.remote_field.through(**{
+                        f'{relation.m2m_field_name()}_id': instance.pk,
+                        f'{relation.m2m_reverse_field_name()}_id': obj.pk,
+                    })
+                    for instance, item in zip(instances, validated_data)
+                    for obj in item.get(name, ())
+                ])
+            self.after_bulk_create(instances, validated_data)
+            # bulk_create() sends no signals for the api.signals receivers.
+            invalidate(model, *(
+                relation.remote_field.through
+                for relation in relations.values()
+            ))
+        prefetch_related_objects(instances, *relations)
+        return instances
+
+    def after_bulk_create(self, instances, validated_data):
+        """Hook for the data derived from the inserted rows."""
+
+
+def insert(model, instances, using):
+    """Insert the instances in as few queries as the backend allows.
+
+    Django 2.2 only gets the ids of a bulk_create() back from PostgreSQL,
+    the other backends insert the rows one by one.
+    """
+    if connections[using].features.can_return_ids_from_bulk_insert:
+        model._default_manager.using(using).bulk_create(instances)
+        return
+    for instance in instances:
+        # save() without its signals, as bulk_create() sends none.
+        instance._save_table(cls=model, force_insert=True, using=using)
+        instance._state.db = using
+        instance._state.adding = False
@@ -0,0 +1,60 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'response-version:{}'
+
+
+def version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def model_versions(models):
+    """Current cache version of every model, in the order given."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock, so that an evicted version does not
+            # bring back the responses cached under its old values.
+            start = time.time_ns()
+            cache.add(key, start, None)
+            versions[key] = cache.get(key, start)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*models):
+    """Make every cached response built from these models unreachable."""
+    for model in models:
+        key = version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate(*models):
+    # The second bump drops what concurrent requests cached from the rows
+    # as they were before the transaction committed.
+    bump_versions(*models)
+    transaction.on_commit(lambda: bump_versions(*models))
+
+
+def response_key(request, versions):
+    user = request.user
+    if user.is_authenticated:
+        role = f'{user.role}:{user.is_staff}:{user.is_superuser}'
+    else:
+        role = 'anonymous'
+    return 'response:' + hashlib.md5(repr((
+        request.build_absolute_uri(),
+        request.accepted_media_type,
+        role,
+        versions,
+    )).encode()).hexdigest()
+
+
+def etag(content):
+    return '"{}"'.format(hashlib.md5(content).hexdigest())
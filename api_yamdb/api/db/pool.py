@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+# Connections inherited through fork(). Closing one from the child would
+# end the session of the parent, and so would garbage collecting it.
+orphaned = []
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Database connections of one process, each lent to one thread.
+
+    At most size connections are open. A thread asking for one when all
+    are lent waits up to timeout seconds. A connection idle for longer
+    than check_interval seconds is checked before it is lent, and one
+    older than max_lifetime seconds is closed instead of reused. After a
+    fork the child forgets the connections of the parent and opens its
+    own.
+
+    Subclasses open, check, reset and close the connections of their
+    database.
+    """
+
+    def __init__(self, size=10, timeout=10, check_interval=0,
+                 max_lifetime=None):
+        self.size = size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self.stats = dict.fromkeys((
+            'connects', 'checkouts', 'waits', 'timeouts', 'failed_checks',
+            'recycled'
+        ), 0)
+        self.stats['wait_seconds'] = 0.0
+        self.start()
+
+    def start(self):
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        # (connection, opened at, returned at), the last returned on top.
+        self.idle = []
+        self.opened = {}
+        self.in_use = 0
+
+    def connect(self):
+        raise NotImplementedError
+
+    def check(self, connection):
+        """Raise when the connection cannot run a query."""
+        raise NotImplementedError
+
+    def reset(self, connection):
+        """Return whether the connection can be lent again."""
+        raise NotImplementedError
+
+    def close(self, connection):
+        raise NotImplementedError
+
+    def count(self, name, amount=1):
+        with self.condition:
+            self.stats[name] += amount
+
+    def check_fork(self):
+        if self.pid != os.getpid():
+            orphaned.extend(connection for connection, _, _ in self.idle)
+            self.start()
+
+    def expired(self, opened, now):
+        return self.max_lifetime is not None and (
+            now - opened >= self.max_lifetime
+        )
+
+    def usable(self, entry):
+        connection, opened, returned = entry
+        now = time.monotonic()
+        if self.expired(opened, now):
+            self.count('recycled')
+            return False
+        if now - returned < self.check_interval:
+            return True
+        try:
+            self.check(connection)
+        except Exception:
+            self.count('failed_checks')
+            return False
+        return True
+
+    def acquire(self):
+        self.check_fork()
+        started = time.monotonic()
+        with self.condition:
+            waited = False
+            while not self.idle and self.in_use >= self.size:
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f'No free connection in the pool of {self.size} '
+                        f'after {self.timeout} seconds.'
+                    )
+                waited = True
+                self.condition.wait(remaining)
+            if waited:
+                self.stats['waits'] += 1
+                self.stats['wait_seconds'] += time.monotonic() - started
+            self.stats['checkouts'] += 1
+            self.in_use += 1
+            entry = self.idle.pop() if self.idle else None
+        # Checks and connects run outside of the lock.
+        try:
+            while entry is not None:
+                if self.usable(entry):
+                    return entry[0]
+                self.discard(entry[0])
+                with self.condition:
+                    entry = self.idle.pop() if self.idle else None
+            connection = self.connect()
+        except BaseException:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        self.count('connects')
+        self.opened[id(connection)] = time.monotonic()
+        return connection
+
+    def release(self, connection):
+        if self.pid != os.getpid():
+            orphaned.append(connection)
+            return
+        try:
+            usable = self.reset(connection)
+        except Exception:
+            usable = False
+        now = time.monotonic()
+        opened = self.opened.get(id(connection), now)
+        if usable and self.expired(opened, now):
+            self.count('recycled')
+            usable = False
+        with self.condition:
+            self.in_use -= 1
+            if usable:
+                self.idle.append((connection, opened, now))
+            self.condition.notify()
+        if not usable:
+            self.discard(connection)
+
+    def discard(self, connection):
+        self.opened.pop(id(connection), None)
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+    def snapshot(self):
+        self.check_fork()
+        with self.condition:
+            return dict(
+                self.stats, size=self.size, in_use=self.in_use,
+                idle=len(self.idle)
+            )
+
+
+def get_pool(key, build):
+    """The pool of the process for key, built on first use."""
+    with pools_lock:
+        if key not in pools:
+            pools[key] = build()
+        return pools[key]
+
+
+def pool_stats():
+    return {key[0]: pool.snapshot() for key, pool in pools.items()}
@@ -0,0 +1,91 @@
+"""PostgreSQL backend whose connections come from a per process pool.
+
+Django still opens and closes its connection around every request, with
+CONN_MAX_AGE = 0, but opening takes a connection from the pool and
+closing gives it back. Select it with DB_ENGINE=api.db.postgresql and
+size it with the POOL entry of the database settings.
+"""
+import os
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from ..pool import ConnectionPool, PoolTimeoutError, get_pool, orphaned
+
+
+class PostgreSQLPool(ConnectionPool):
+
+    def __init__(self, conn_params, **options):
+        super().__init__(**options)
+        self.conn_params = conn_params
+
+    def connect(self):
+        return base.Database.connect(**self.conn_params)
+
+    def check(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+
+    def reset(self, connection):
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        return True
+
+    def close(self, connection):
+        connection.close()
+
+
+def pool_options(settings_dict):
+    options = settings_dict.get('POOL', {})
+    return {
+        'size': options.get('SIZE', 10),
+        'timeout': options.get('TIMEOUT', 10),
+        'check_interval': options.get('CHECK_INTERVAL', 0),
+        'max_lifetime': options.get('MAX_LIFETIME'),
+    }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        key = (self.alias, repr(sorted(conn_params.items())))
+        return get_pool(key, lambda: PostgreSQLPool(
+            conn_params, **pool_options(self.settings_dict)
+        ))
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        try:
+            connection = self.pool.acquire()
+        except PoolTimeoutError as error:
+            raise base.Database.OperationalError(str(error)) from error
+        self.pool_pid = os.getpid()
+        # Same as the parent backend, minus Database.connect().
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def ensure_connection(self):
+        # A connection opened before a fork belongs to the parent.
+        if self.connection is not None and self.pool_pid != os.getpid():
+            orphaned.append(self.connection)
+            self.connection = None
+        super().ensure_connection()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -1,25 +1,60 @@
+from django.db.models import Count
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 from reviews.models import Title
 
+from .search import search
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Comma separated list of values: ?genre=drama,comedy."""
+
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
-    year = filters.NumberFilter(
-        field_name='year',
-        lookup_expr='icontains'
-    )
+    category = filters.CharFilter(field_name='category__slug')
+    genre = CharInFilter(method='filter_any_genre')
+    genre_all = CharInFilter(method='filter_all_genres')
+    name = filters.CharFilter(method='search_name')
+    year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = (
+            'category', 'genre', 'genre_all', 'name',
+            'year', 'year_min', 'year_max'
+        )
+
+    def search_name(self, queryset, name, value):
+        return search(queryset, 'name', value)
+
+    @staticmethod
+    def genre_links(slugs):
+        return Title.genre.through.objects.filter(genre__slug__in=slugs)
+
+    def filter_any_genre(self, queryset, name, value):
+        # A subquery instead of a join: no duplicate rows, no DISTINCT.
+        return queryset.filter(
+            pk__in=self.genre_links(value).values('title_id')
+        )
+
+    def filter_all_genres(self, queryset, name, value):
+        matching = self.genre_links(value).values('title_id').annotate(
+            matched=Count('genre_id')
+        ).filter(matched=len(set(value)))
+        return queryset.filter(pk__in=matching.values('title_id'))
+
+
+class IndexedSearchFilter(SearchFilter):
+    """SearchFilter answering ?search= from the full-text indexes.
+
+    Only the first of the view's search_fields is searched.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        return search(queryset, search_fields[0], ' '.join(search_terms))
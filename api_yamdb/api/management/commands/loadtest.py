@@ -0,0 +1,314 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from api.authentication import ClaimsAccessToken
+from django.core.management.base import BaseCommand, CommandError
+from reviews.models import YaUser
+
+API = '/api/v1'
+
+# Route name: (weight, needs a token, statuses that are not errors).
+# Writes past the throttle limits are answered with 429 by design.
+DEFAULT_MIX = {
+    'titles-list': (25, False, {200}),
+    'titles-filter': (10, False, {200}),
+    'titles-detail': (15, False, {200}),
+    'categories-list': (5, False, {200}),
+    'genres-list': (5, False, {200}),
+    'reviews-list': (15, False, {200}),
+    'reviews-create': (5, True, {201, 400, 429}),
+    'comments-list': (15, False, {200}),
+    'comments-create': (5, True, {201, 429}),
+}
+
+
+def percentile(ordered, share):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples, elapsed):
+    routes = {}
+    for route, results in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        routes[route] = {
+            'requests': len(results),
+            'errors': errors,
+            'error_rate': round(errors / len(results), 4),
+            'rps': round(len(results) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    return routes
+
+
+def compare(baseline, current, tolerance, min_requests=0):
+    """List the routes that got slower, less reliable or lost throughput.
+
+    Routes with fewer than min_requests samples in either run are skipped,
+    their tail percentiles are mostly noise.
+    """
+    regressions = []
+    for route, now in current['routes'].items():
+        before = baseline['routes'].get(route)
+        if before is None or min(
+            before['requests'], now['requests']
+        ) < min_requests:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if now[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{route}: {metric} {before[metric]} -> {now[metric]}'
+                )
+        if now['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append(
+                f'{route}: error_rate {before["error_rate"]} -> '
+                f'{now["error_rate"]}'
+            )
+        if now['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(
+                f'{route}: rps {before["rps"]} -> {now["rps"]}'
+            )
+    return regressions
+
+
+class Target:
+    """Ids discovered on the running instance to build requests from."""
+
+    def __init__(self, session, base_url):
+        self.base_url = base_url
+        titles = session.get(
+            f'{base_url}{API}/titles/', params={'limit': 200}
+        ).json()['results']
+        if not titles:
+            raise CommandError('The instance has no titles to request.')
+        self.titles = [title['id'] for title in titles]
+        self.names = [title['name'].split()[0] for title in titles]
+        self.genres = [
+            genre['slug'] for title in titles for genre in title['genre']
+        ]
+        self.reviews = []
+        for title_id in self.titles[:20]:
+            reviews = session.get(
+                f'{base_url}{API}/titles/{title_id}/reviews/',
+                params={'limit': 50}
+            ).json()['results']
+            self.reviews += [(title_id, review['id']) for review in reviews]
+
+    def request(self, route, rnd):
+        """Return method, url and payload of one request of the route."""
+        title_id = rnd.choice(self.titles)
+        title_url = f'{self.base_url}{API}/titles/{title_id}'
+        if self.reviews:
+            review_url = '{}{}/titles/{}/reviews/{}'.format(
+                self.base_url, API, *rnd.choice(self.reviews)
+            )
+        else:
+            review_url = f'{title_url}/reviews/0'
+        params = {'limit': rnd.choice((10, 20, 50))}
+        return {
+            'titles-list': ('get', f'{self.base_url}{API}/titles/', dict(
+                params, offset=rnd.randrange(0, 100, 10)
+            ), None),
+            'titles-filter': ('get', f'{self.base_url}{API}/titles/', dict(
+                params,
+                name=rnd.choice(self.names),
+                genre=rnd.choice(self.genres or [''])
+            ), None),
+            'titles-detail': ('get', f'{title_url}/', None, None),
+            'categories-list': (
+                'get', f'{self.base_url}{API}/categories/', params, None
+            ),
+            'genres-list': (
+                'get', f'{self.base_url}{API}/genres/', params, None
+            ),
+            'reviews-list': ('get', f'{title_url}/reviews/', params, None),
+            'reviews-create': ('post', f'{title_url}/reviews/', None, {
+                'text': 'Load test review', 'score': rnd.randint(1, 10)
+            }),
+            'comments-list': (
+                'get', f'{review_url}/comments/', params, None
+            ),
+            'comments-create': ('post', f'{review_url}/comments/', None, {
+                'text': 'Load test comment'
+            }),
+        }[route]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted mix of API calls against a running instance '
+        'and report latency percentiles, RPS and error rate per route.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--duration', type=float, default=30, help='Seconds to run.'
+        )
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--mix',
+            help='JSON file with a weight per route, e.g. '
+                 '{"titles-list": 50, "reviews-create": 1}.'
+        )
+        parser.add_argument(
+            '--token',
+            action='append',
+            default=[],
+            help='JWT used by the authenticated routes, may be repeated.'
+        )
+        parser.add_argument(
+            '--mint-tokens',
+            type=int,
+            default=0,
+            metavar='N',
+            help='Issue tokens for N users of the local database.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the report here.')
+        parser.add_argument(
+            '--compare',
+            metavar='BASELINE',
+            help='Fail on regressions against an earlier report.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.1,
+            help='Allowed relative change before a regression is flagged.'
+        )
+        parser.add_argument(
+            '--min-requests',
+            type=int,
+            default=50,
+            help='Do not compare routes with fewer samples than this.'
+        )
+
+    def handle(self, *args, **options):
+        tokens = list(options['token'])
+        if options['mint_tokens']:
+            tokens += [
+                str(ClaimsAccessToken.for_user(user))
+                for user in YaUser.objects.all()[:options['mint_tokens']]
+            ]
+        mix = self.mix(options['mix'], bool(tokens))
+        target = Target(requests.Session(), options['url'].rstrip('/'))
+
+        samples = defaultdict(list)
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+        local = threading.local()
+
+        def worker(number):
+            rnd = random.Random(options['seed'] * 1000 + number)
+            local.session = requests.Session()
+            results = defaultdict(list)
+            routes, weights = zip(*mix.items())
+            while time.monotonic() < deadline:
+                route = rnd.choices(routes, weights)[0]
+                results[route].append(self.call(
+                    local.session, target, route, rnd, tokens
+                ))
+            with lock:
+                for route, route_results in results.items():
+                    samples[route] += route_results
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            list(executor.map(worker, range(options['concurrency'])))
+        elapsed = time.monotonic() - started
+
+        total = sum(len(results) for results in samples.values())
+        report = {
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'duration': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2),
+            'routes': summarize(samples, elapsed),
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = compare(
+                baseline, report, options['tolerance'],
+                options['min_requests']
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressions found:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('No regressions against the baseline.')
+
+    @staticmethod
+    def mix(path, authenticated):
+        weights = {route: spec[0] for route, spec in DEFAULT_MIX.items()}
+        if path:
+            with open(path, encoding='utf-8') as file:
+                weights = json.load(file)
+            if not isinstance(weights, dict):
+                raise CommandError('The mix must map routes to weights.')
+            unknown = set(weights) - set(DEFAULT_MIX)
+            if unknown:
+                raise CommandError(f'Unknown routes: {", ".join(unknown)}')
+            invalid = [
+                route for route, weight in weights.items()
+                if isinstance(weight, bool)
+                or not isinstance(weight, (int, float)) or weight < 0
+            ]
+            if invalid:
+                raise CommandError(
+                    f'Weights must be positive numbers: {", ".join(invalid)}'
+                )
+        if not authenticated:
+            weights = {
+                route: weight for route, weight in weights.items()
+                if not DEFAULT_MIX[route][1]
+            }
+        weights = {
+            route: weight for route, weight in weights.items() if weight
+        }
+        if not weights:
+            raise CommandError(
+                'The mix has no routes to request' + (
+                    '.' if authenticated
+                    else ' without --token or --mint-tokens.'
+                )
+            )
+        return weights
+
+    @staticmethod
+    def call(session, target, route, rnd, tokens):
+        method, url, params, payload = target.request(route, rnd)
+        headers = {}
+        if DEFAULT_MIX[route][1]:
+            headers['Authorization'] = f'Bearer {rnd.choice(tokens)}'
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                method, url, params=params, json=payload, headers=headers,
+                timeout=30
+            )
+            ok = response.status_code in DEFAULT_MIX[route][2]
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
@@ -0,0 +1,263 @@
+import atexit
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from .db.pool import pool_stats
+
+# Upper bounds of the latency histogram, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+POOL_GAUGES = ('in_use', 'idle', 'size')
+POOL_COUNTERS = (
+    'connects', 'checkouts', 'waits', 'wait_seconds', 'timeouts',
+    'failed_checks', 'recycled'
+)
+# Files not refreshed for this many flush intervals are of dead processes,
+# whose counters still count but whose gauges do not.
+STALE_FLUSHES = 3
+
+
+class SQLRecorder:
+    """Counts the statements of a request and the time spent on them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class Registry:
+    """Request totals of this process, saved to METRICS_DIR.
+
+    Every process rewrites its own file once per flush interval from a
+    background thread, idle or not, and the metrics view adds up the
+    files of all the processes, leaving out the pool gauges of the dead
+    ones. Without METRICS_DIR the view shows the process that answers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.pid = None
+
+    def path(self):
+        return os.path.join(
+            settings.METRICS_DIR, f'{socket.gethostname()}-{os.getpid()}.json'
+        )
+
+    def record(self, route, method, status, seconds, queries, sql_seconds):
+        with self.lock:
+            if self.pid != os.getpid():
+                # The totals of a parent process are already in its file.
+                self.routes = {}
+                self.pid = os.getpid()
+                threading.Thread(target=self.heartbeat, daemon=True).start()
+            key = f'{route} {method}'
+            totals = self.routes.get(key)
+            if totals is None:
+                totals = self.routes[key] = {
+                    'route': route, 'method': method, 'count': 0,
+                    'seconds': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+                    'statuses': {}, 'queries': 0, 'sql_seconds': 0.0,
+                }
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['buckets'][bisect_left(BUCKETS, seconds)] += 1
+            status = str(status)
+            totals['statuses'][status] = totals['statuses'].get(status, 0) + 1
+            totals['queries'] += queries
+            totals['sql_seconds'] += sql_seconds
+
+    def heartbeat(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            routes = [] if self.pid != os.getpid() else self.routes.values()
+            return json.loads(json.dumps({
+                'routes': list(routes), 'pools': pool_stats()
+            }))
+
+    def flush(self):
+        if not settings.METRICS_DIR or self.pid != os.getpid():
+            return
+        content = json.dumps(self.snapshot())
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.path()
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(temporary, path)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+class MetricsMiddleware:
+    """Records latency, status and SQL of every request by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = SQLRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else 'unmatched', request.method,
+            response.status_code, time.perf_counter() - start,
+            recorder.count, recorder.seconds
+        )
+        return response
+
+
+def saved_snapshots():
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    oldest = time.time() - STALE_FLUSHES * settings.METRICS_FLUSH_INTERVAL
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(settings.METRICS_DIR, name)
+        try:
+            with open(path, encoding='utf-8') as file:
+                saved = json.load(file)
+            stale = os.path.getmtime(path) < oldest
+        except (OSError, ValueError):
+            # Written by a process that died halfway, or removed since.
+            continue
+        if stale:
+            # Its connections are long closed; dropping its counters
+            # instead would read as a reset of every counter.
+            for stats in saved['pools'].values():
+                stats.update(dict.fromkeys(POOL_GAUGES, 0))
+        yield saved
+
+
+def merge(snapshots):
+    """Totals of several processes, by route and by database."""
+    routes = {}
+    pools = {}
+    for saved in snapshots:
+        for totals in saved['routes']:
+            key = (totals['route'], totals['method'])
+            if key not in routes:
+                routes[key] = totals
+                continue
+            merged = routes[key]
+            for field in ('count', 'seconds', 'queries', 'sql_seconds'):
+                merged[field] += totals[field]
+            merged['buckets'] = [
+                own + other
+                for own, other in zip(merged['buckets'], totals['buckets'])
+            ]
+            for status, count in totals['statuses'].items():
+                merged['statuses'][status] = (
+                    merged['statuses'].get(status, 0) + count
+                )
+        for alias, stats in saved['pools'].items():
+            merged = pools.setdefault(alias, dict.fromkeys(stats, 0))
+            for field, value in stats.items():
+                merged[field] += value
+    return routes, pools
+
+
+def render(routes, pools):
+    """Every family is its TYPE line followed by all of its samples."""
+    routes = [
+        (f'route="{route}",method="{method}"', totals)
+        for (route, method), totals in sorted(routes.items())
+    ]
+    lines = ['# TYPE api_request_duration_seconds histogram']
+    for labels, totals in routes:
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, '+Inf'), totals['buckets']):
+            cumulative += count
+            lines.append(
+                f'api_request_duration_seconds_bucket'
+                f'{{{labels},le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'api_request_duration_seconds_sum{{{labels}}} '
+            f'{totals["seconds"]}'
+        )
+        lines.append(
+            f'api_request_duration_seconds_count{{{labels}}} '
+            f'{totals["count"]}'
+        )
+    lines.append('# TYPE api_requests_total counter')
+    for labels, totals in routes:
+        lines.extend(
+            f'api_requests_total{{{labels},status="{status}"}} {count}'
+            for status, count in sorted(totals['statuses'].items())
+        )
+    lines.append('# TYPE api_sql_queries_total counter')
+    lines.extend(
+        f'api_sql_queries_total{{{labels}}} {totals["queries"]}'
+        for labels, totals in routes
+    )
+    lines.append('# TYPE api_sql_seconds_total counter')
+    lines.extend(
+        f'api_sql_seconds_total{{{labels}}} {totals["sql_seconds"]}'
+        for labels, totals in routes
+    )
+    for name in POOL_GAUGES:
+        lines.append(f'# TYPE db_pool_{name} gauge')
+        lines.extend(
+            f'db_pool_{name}{{database="{alias}"}} {stats[name]}'
+            for alias, stats in sorted(pools.items())
+        )
+    for name in POOL_COUNTERS:
+        lines.append(f'# TYPE db_pool_{name}_total counter')
+        lines.extend(
+            f'db_pool_{name}_total{{database="{alias}"}} {stats[name]}'
+            for alias, stats in sorted(pools.items())
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    """Prometheus text format, for requests bearing METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    if settings.METRICS_DIR:
+        registry.flush()
+        snapshots = saved_snapshots()
+    else:
+        snapshots = [registry.snapshot()]
+    return HttpResponse(
+        render(*merge(snapshots)), content_type='text/plain; version=0.0.4'
+    )
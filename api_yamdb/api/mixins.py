@@ -1,8 +1,20 @@
-
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
+from reviews.models import (MAX_SCORE, MIN_SCORE, MonthlyScore, Review,
+                            ScoreCount, Title)
+
+from .cache import etag, model_versions, response_key
+from .routers import replica
 
 
 class CreateListDestroyViewSet(CreateModelMixin, ListModelMixin,
@@ -12,3 +24,213 @@ class CreateListDestroyViewSet(CreateModelMixin, ListModelMixin,
 
 class CreateViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     pass
+
+
+class BulkCreateMixin:
+    """POST of a JSON list creates all of its items in one transaction.
+
+    The serializer needs a BulkListSerializer as its list serializer
+    class; errors come back as a list with one entry per item.
+    """
+    bulk_create_permission_classes = ()
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        for permission_class in self.bulk_create_permission_classes:
+            if not permission_class().has_permission(request, self):
+                self.permission_denied(request)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, serializer):
+        serializer.save()
+
+
+class NestedParentMixin:
+    """Check the parent chain in the URL of a nested route.
+
+    parent_lookups maps the URL kwargs to lookups on parent_model; the
+    chain is checked with one EXISTS query, at most once per request.
+    Lists only check it when the page is empty, rows filtered by the
+    chain already prove that it exists.
+    """
+    parent_model = None
+    parent_lookups = {}
+
+    def parent_exists(self):
+        request = self.request
+        if not hasattr(request, 'nested_parent_exists'):
+            request.nested_parent_exists = self.parent_model.objects.filter(
+                **{
+                    lookup: self.kwargs[kwarg]
+                    for kwarg, lookup in self.parent_lookups.items()
+                }
+            ).exists()
+        return request.nested_parent_exists
+
+    def check_parent(self):
+        if not self.parent_exists():
+            raise Http404
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not (queryset if page is None else page):
+            self.check_parent()
+        return page
+
+
+class CachedResponseMixin:
+    """Serve the JSON of list and retrieve from the cache.
+
+    Responses are keyed on the URL, the role of the user and the versions
+    of cache_models, which the api.signals receivers bump on every write.
+    Every cacheable response carries a strong ETag and If-None-Match
+    requests get a 304. A hit is answered by dispatch() without calling
+    the handler. Off unless the cache is shared by all processes.
+    """
+    cache_models = ()
+    cache_actions = ('list', 'retrieve')
+    response_cache_key = None
+    cached_response = None
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def get_response_cache_key(self, request):
+        if (
+            not settings.RESPONSE_CACHE_TIMEOUT
+            # Another process would keep serving what this one dropped.
+            or not settings.CACHE_SHARED
+            or request.method not in ('GET', 'HEAD')
+            or self.action not in self.cache_actions
+            or request.accepted_renderer.format != 'json'
+        ):
+            return None
+        return response_key(request, model_versions(self.get_cache_models()))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = self.get_response_cache_key(request)
+        if self.response_cache_key is None:
+            return
+        cached = cache.get(self.response_cache_key)
+        if cached is None:
+            return
+        content, content_type, tag = cached
+        self.cached_response = HttpResponse(content, content_type=content_type)
+        self.cached_response['ETag'] = tag
+
+    def dispatch(self, request, *args, **kwargs):
+        # APIView.dispatch(), answering a cache hit without the handler.
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request, *args, **kwargs)
+            response = self.cached_response
+            if response is None:
+                method = request.method.lower()
+                handler = self.http_method_not_allowed
+                if method in self.http_method_names:
+                    handler = getattr(self, method, handler)
+                response = handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.response_cache_key is None or response.status_code != 200:
+            return response
+        if isinstance(response, Response):
+            response.render()
+            response['ETag'] = etag(response.content)
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            if replica():
+                # A lagging replica may have missed the write that bumped
+                # the versions, keep what it said only for a short while.
+                timeout = min(timeout, settings.REPLICA_STICKY_SECONDS)
+            cache.set(
+                self.response_cache_key,
+                (response.content, response['Content-Type'], response['ETag']),
+                timeout
+            )
+        cache_control = {'max_age': settings.RESPONSE_CACHE_MAX_AGE}
+        if settings.RESPONSE_CACHE_STALE_WHILE_REVALIDATE:
+            cache_control['stale_while_revalidate'] = (
+                settings.RESPONSE_CACHE_STALE_WHILE_REVALIDATE
+            )
+        if request.user.is_authenticated:
+            cache_control['private'] = True
+        else:
+            cache_control['public'] = True
+        patch_cache_control(response, **cache_control)
+        patch_vary_headers(response, ('Authorization',))
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if response['ETag'] in etags or '*' in etags:
+            not_modified = HttpResponseNotModified()
+            for header in ('ETag', 'Cache-Control', 'Vary'):
+                not_modified[header] = response[header]
+            return not_modified
+        return response
+
+
+class RatingStatsMixin:
+    """Score distribution and monthly trend at <object>/stats/.
+
+    Summed up from the ScoreCount and MonthlyScore rows of the titles
+    that stats_lookup matches with the object. Put it before
+    CachedResponseMixin, which then caches the action too.
+    """
+    stats_lookup = 'title'
+    cache_actions = ('list', 'retrieve', 'stats')
+    stats_cache_models = (
+        ScoreCount, MonthlyScore, Review, Title, Title.genre.through
+    )
+
+    def get_cache_models(self):
+        if self.action == 'stats':
+            return (*super().get_cache_models(), *self.stats_cache_models)
+        return super().get_cache_models()
+
+    @action(detail=True, methods=('get',))
+    def stats(self, request, *args, **kwargs):
+        lookup = {self.stats_lookup: self.get_object()}
+        counts = dict(
+            ScoreCount.objects.filter(**lookup).order_by().values(
+                'score'
+            ).annotate(total=Sum('reviews')).values_list('score', 'total')
+        )
+        months = MonthlyScore.objects.filter(**lookup).order_by(
+            'month'
+        ).values('month').annotate(
+            score_sum=Sum('score_sum'), review_count=Sum('review_count')
+        )
+        reviews = sum(counts.values())
+        score_sum = sum(score * count for score, count in counts.items())
+        return Response({
+            'reviews': reviews,
+            'rating': score_sum / reviews if reviews else None,
+            'scores': [
+                {'score': score, 'reviews': counts.get(score, 0)}
+                for score in range(MIN_SCORE, MAX_SCORE + 1)
+            ],
+            'months': [
+                {
+                    'month': f'{month["month"]:%Y-%m}',
+                    'reviews': month['review_count'],
+                    'rating': month['score_sum'] / month['review_count'],
+                }
+                for month in months if month['review_count']
+            ],
+        })
@@ -0,0 +1,118 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination)
+
+from .cache import model_versions
+
+
+class CachedCountLimitOffsetPagination(LimitOffsetPagination):
+    """Offset pages whose total count is estimated or cached.
+
+    Unfiltered PostgreSQL tables bigger than the estimate threshold report
+    the planner estimate, other counts are cached for a short while, or
+    until a write bumps the cache version of the view models.
+    """
+    count_models = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_models = getattr(view, 'cache_models', ())
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        versions = model_versions(
+            dict.fromkeys((queryset.model, *self.count_models))
+        )
+        key = 'pagination-count:' + hashlib.md5(
+            repr((queryset.db, sql, params, versions)).encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate_count(queryset)
+            if count is None:
+                count = super().get_count(queryset)
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    @staticmethod
+    def estimate_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                (queryset.model._meta.db_table,)
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < settings.PAGINATION_COUNT_ESTIMATE_FROM:
+            return None
+        return row[0]
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pages keyed on the ordering of the view queryset.
+
+    The ordering should be backed by an index, e.g. reviews of a title by
+    (title_id, pub_date, id).
+    """
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(
+            queryset.query.order_by
+            or queryset.model._meta.ordering
+            or ('pk',)
+        )
+
+
+class HybridPagination(BasePagination):
+    """Offset pages by default, keyset pages on request.
+
+    Clients switch to keyset pages with ?pagination=cursor; the next and
+    previous links then carry a ?cursor= value which keeps them there.
+    """
+    cursor_query_param = KeysetPagination.cursor_query_param
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.paginator = CachedCountLimitOffsetPagination()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
+
+    def uses_cursor(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_cursor(request):
+            self.paginator = KeysetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return self.paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
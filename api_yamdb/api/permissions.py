@@ -22,7 +22,7 @@ class IsAdminUserOrReadOnly(permissions.BasePermission):
 class IsAuthorModeratorAdminOrReadOnly(permissions.IsAuthenticatedOrReadOnly):
     def has_object_permission(self, request, view, obj):
         if request.method in ['PATCH', 'PUT', 'DELETE']:
-            if not (obj.author == request.user
+            if not (obj.author_id == request.user.id
                     or request.user.is_moderator
                     or request.user.is_admin):
                 raise PermissionDenied('Изменение чужого контента запрещено!')
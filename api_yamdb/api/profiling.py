@@ -0,0 +1,190 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+
+from .authentication import ClaimsJWTAuthentication
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAMETER = 'profile'
+MODES = ('report', 'store')
+
+# Not worth a line of the report: the profiler itself.
+IGNORED_FILES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+# tracemalloc and the profiler hooks are per process: one request at a time.
+profiling = threading.Lock()
+
+
+class SQLLog:
+    """Every statement of a request with its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def profile_mode(request):
+    """report or store when the request asks to be profiled, else None."""
+    mode = request.META.get(PROFILE_HEADER)
+    if mode is None:
+        query = request.META.get('QUERY_STRING', '')
+        if PROFILE_PARAMETER not in query:
+            return None
+        mode = parse_qs(query).get(PROFILE_PARAMETER, [None])[0]
+        if mode is None:
+            return None
+    mode = mode.lower()
+    if mode in ('1', 'true', ''):
+        return 'report'
+    return mode if mode in MODES else None
+
+
+def is_staff(request):
+    """Whether the session or the bearer token belongs to an admin."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            authenticated = ClaimsJWTAuthentication().authenticate(request)
+        except (AuthenticationFailed, InvalidToken):
+            return False
+        if authenticated is None:
+            return False
+        user = authenticated[0]
+    return user.is_admin or user.is_staff
+
+
+def top_functions(profile, limit):
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'primitive_calls': primitive,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (primitive, calls, own, cumulative, _)
+        in rows[:limit]
+    ]
+
+
+def top_allocations(before, after, limit):
+    differences = after.filter_traces(IGNORED_FILES).compare_to(
+        before.filter_traces(IGNORED_FILES), 'lineno'
+    )
+    return [
+        {
+            'site': f'{difference.traceback[0].filename}:'
+                    f'{difference.traceback[0].lineno}',
+            'kb': round(difference.size_diff / 1024, 1),
+            'blocks': difference.count_diff,
+        }
+        for difference in differences[:limit]
+        if difference.size_diff > 0
+    ]
+
+
+class ProfilingMiddleware:
+    """Profiles single requests of admins on demand.
+
+    A request with the X-Profile header or the profile query parameter,
+    sent with an admin token or session, runs under cProfile and
+    tracemalloc with its SQL logged. With the value 1 or report the
+    answer is the report instead of the response; with store the
+    response is sent as usual and the report is saved to PROFILE_DIR
+    under the id in the X-Profile-Id header. While another request of
+    the process is profiled the answer is 409. Other requests only pay
+    for looking at the header and the query string.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profile_mode(request)
+        if mode is None or not is_staff(request):
+            return self.get_response(request)
+        if not profiling.acquire(blocking=False):
+            response = JsonResponse(
+                {'detail': 'Уже профилируется другой запрос.'}, status=409
+            )
+            response['Retry-After'] = 1
+            return response
+        try:
+            return self.profile(request, mode)
+        finally:
+            profiling.release()
+
+    def profile(self, request, mode):
+        log = SQLLog()
+        profile = cProfile.Profile()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(log))
+                profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profile.disable()
+            seconds = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        limit = settings.PROFILE_TOP
+        report = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'ms': round(seconds * 1000, 3),
+            'sql_ms': round(sum(query['ms'] for query in log.queries), 3),
+            'queries': log.queries,
+            'functions': top_functions(profile, limit),
+            'allocations': top_allocations(before, after, limit),
+        }
+        if mode == 'report':
+            return JsonResponse(report)
+        report_id = uuid.uuid4().hex
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        with open(
+            os.path.join(settings.PROFILE_DIR, f'{report_id}.json'), 'w',
+            encoding='utf-8'
+        ) as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        response['X-Profile-Id'] = report_id
+        return response
@@ -0,0 +1,88 @@
+import hashlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Routing of the request handled by the current thread.
+state = threading.local()
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica():
+    """The replica serving reads right now, None for the primary."""
+    return getattr(state, 'replica', None)
+
+
+def sticky_key(request):
+    # Guests by their own address behind NUM_PROXIES, not that of nginx.
+    client = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or BaseThrottle().get_ident(request)
+    )
+    return 'replica-sticky:' + hashlib.md5(client.encode()).hexdigest()
+
+
+class ReplicaRouter:
+    """Sends the reads of the api and reviews apps to a replica.
+
+    Only requests let through by ReplicaMiddleware read from a replica,
+    one picked per request. Writes, management commands and everything
+    else use the primary.
+    """
+    route_app_labels = ('api', 'reviews')
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            return replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Not None, or an object read from a replica would be saved there.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = ('default', *settings.DATABASE_REPLICAS)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Chooses the database that serves the reads of a request.
+
+    Safe requests read from a random replica. Unsafe requests stay on the
+    primary, and once one succeeds its client, told apart by token or by
+    address, reads from the primary for REPLICA_STICKY_SECONDS, long
+    enough for the replicas to catch up with the write. The marker lives
+    in the cache, so without one shared by every process all reads stay
+    on the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS or not settings.CACHE_SHARED:
+            return self.get_response(request)
+        safe = request.method in SAFE_METHODS
+        if safe and not cache.get(sticky_key(request)):
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+        try:
+            response = self.get_response(request)
+        finally:
+            state.replica = None
+        if not safe and response.status_code < 400:
+            cache.set(
+                sticky_key(request), True, settings.REPLICA_STICKY_SECONDS
+            )
+        return response
@@ -0,0 +1,135 @@
+from django.contrib.postgres.lookups import PostgresSimpleLookup
+from django.contrib.postgres.search import TrigramBase
+from django.db import connections
+from django.db.models import CharField, IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+
+# The trigram tokenizer of SQLite FTS5 cannot match shorter terms.
+FTS_MIN_LENGTH = 3
+SEARCH_MODELS = ('Title', 'Category', 'Genre')
+
+
+class TrigramWordSimilar(PostgresSimpleLookup):
+    """Fuzzy match of the term against any word run of the column.
+
+    Served by the gin_trgm_ops indexes created in the search migration.
+    """
+    lookup_name = 'trigram_word_similar'
+    operator = '%%>'
+
+
+class TrigramWordSimilarity(TrigramBase):
+    function = 'WORD_SIMILARITY'
+
+    def __init__(self, expression, string, **extra):
+        # word_similarity() takes the search term first.
+        super().__init__(expression, string, **extra)
+        self.source_expressions.reverse()
+
+
+CharField.register_lookup(TrigramWordSimilar)
+
+
+class MatchedRowids(RawSQL):
+    """Subquery of the rowids of the FTS5 matches, for a pk__in lookup.
+
+    Left without the parentheses of RawSQL, the lookup adds its own and
+    SQLite reads IN ((SELECT ...)) as a comparison with the first row.
+    """
+
+    def __init__(self, sql, params):
+        super().__init__(sql, params, output_field=IntegerField())
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def search(queryset, field, term):
+    """Filter the queryset by the term and order it by relevance.
+
+    PostgreSQL uses the trigram indexes on UPPER(field): substring matches
+    and typos within the similarity threshold are found and ranked by
+    word similarity. SQLite uses the FTS5 trigram tables and bm25 rank.
+    Other backends and short terms fall back to icontains.
+    """
+    term = ' '.join(term.split())
+    if not term:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return postgresql_search(queryset, field, term)
+    if vendor == 'sqlite' and len(term) >= FTS_MIN_LENGTH:
+        return sqlite_search(queryset, field, term)
+    return queryset.filter(**{f'{field}__icontains': term})
+
+
+def postgresql_search(queryset, field, term):
+    # Both sides go through the database UPPER() to match the index.
+    term = Upper(Value(term))
+    return queryset.annotate(
+        search_value=Upper(field),
+        search_rank=TrigramWordSimilarity(Upper(field), term)
+    ).filter(
+        Q(search_value__contains=term)
+        | Q(search_value__trigram_word_similar=term)
+    ).order_by('-search_rank', field, 'pk')
+
+
+def sqlite_search(queryset, field, term):
+    table = queryset.model._meta.db_table
+    fts_table = f'{table}_fts'
+    match = '"{}"'.format(term.replace('"', '""'))
+    return queryset.filter(pk__in=MatchedRowids(
+        f'SELECT rowid FROM "{fts_table}" WHERE "{fts_table}" MATCH %s',
+        (match,)
+    )).annotate(
+        search_rank=RawSQL(
+            f'SELECT rank FROM "{fts_table}" WHERE "{fts_table}" MATCH %s '
+            f'AND rowid = "{table}"."id"',
+            (match,)
+        )
+    ).order_by('search_rank', field, 'pk')
+
+
+def create_sqlite_search_tables(app_config, using, **kwargs):
+    """Keep an FTS5 trigram table in sync with every searchable table.
+
+    Runs after each migrate, as SQLite drops the triggers whenever a
+    migration rebuilds a table.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for model_name in SEARCH_MODELS:
+            table = app_config.get_model(model_name)._meta.db_table
+            fts = f'{table}_fts'
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+                f"name, content='{table}', content_rowid='id', "
+                f"tokenize='trigram')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{fts}_insert" '
+                f'AFTER INSERT ON "{table}" BEGIN '
+                f'INSERT INTO "{fts}" (rowid, name) '
+                f'VALUES (new.id, new.name); END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{fts}_delete" '
+                f'AFTER DELETE ON "{table}" BEGIN '
+                f'INSERT INTO "{fts}" ("{fts}", rowid, name) '
+                f"VALUES ('delete', old.id, old.name); END"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{fts}_update" '
+                f'AFTER UPDATE OF name ON "{table}" BEGIN '
+                f'INSERT INTO "{fts}" ("{fts}", rowid, name) '
+                f"VALUES ('delete', old.id, old.name); "
+                f'INSERT INTO "{fts}" (rowid, name) '
+                f'VALUES (new.id, new.name); END'
+            )
+            cursor.execute(
+                f'INSERT INTO "{fts}" ("{fts}") VALUES (\'rebuild\')'
+            )
@@ -1,5 +1,10 @@
+from django.db import IntegrityError
 from rest_framework import serializers
-from reviews.models import Category, Comment, Genre, Review, Title, YaUser
+from rest_framework.settings import api_settings
+from reviews.models import (Category, Comment, Genre, LeaderboardEntry, Review,
+                            Title, YaUser, confirmation_codes, roll_up_reviews)
+
+from .bulk import BatchedSlugRelatedField, BulkListSerializer
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -10,16 +15,26 @@ class ReviewSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault()
     )
 
-    def validate(self, attr):
-        """There is possible to live only one review on masterpiece."""
-        if self.context.get('view').request.method == 'POST':
-            title_id = self.context.get('view').kwargs.get('title_id')
-            author = self.context.get('view').request.user
-            if Review.objects.filter(title=title_id).filter(author=author):
-                raise serializers.ValidationError(
+    def create(self, validated_data):
+        """There is possible to live only one review on masterpiece.
+
+        The unique constraint decides, so concurrent posts cannot both pass;
+        Review.save() runs in its own transaction or savepoint.
+        """
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            duplicate = Review.objects.filter(
+                title_id=validated_data['title_id'],
+                author=validated_data['author']
+            ).exists()
+            if not duplicate:
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
                     'Вы уже оставили отзыв на это произведение!'
-                )
-        return attr
+                ]
+            })
 
     class Meta:
         model = Review
@@ -27,6 +42,49 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'author', 'pub_date')
 
 
+class ReviewListSerializer(BulkListSerializer):
+    """Reviews imported for one title, one review per author."""
+
+    def check_unique(self, unique, items, errors):
+        super().check_unique(unique, items, errors)
+        reviewed = set(Review.objects.filter(
+            title_id=self.context['view'].kwargs.get('title_id'),
+            author__in=[item['author'] for item in items if item]
+        ).values_list('author_id', flat=True))
+        for number, item in enumerate(items):
+            if not item:
+                continue
+            if item['author'].pk in reviewed:
+                errors[number].setdefault(
+                    api_settings.NON_FIELD_ERRORS_KEY, []
+                ).append('Автор уже оставил отзыв на это произведение!')
+                items[number] = None
+            reviewed.add(item['author'].pk)
+
+    def after_bulk_create(self, instances, validated_data):
+        # The post_save receiver that keeps the totals does not run here.
+        Title.objects.filter(pk=instances[0].title_id).update_rating(
+            sum(review.score for review in instances), len(instances)
+        )
+        LeaderboardEntry.objects.review_added(instances[0].title_id)
+        roll_up_reviews([
+            (review.title_id, review.score, review.pub_date, 1)
+            for review in instances
+        ])
+
+
+class ReviewImportSerializer(ReviewSerializer):
+    """Reviews posted by an admin on behalf of their authors."""
+    author = BatchedSlugRelatedField(
+        queryset=YaUser.objects.all(),
+        slug_field='username'
+    )
+
+    class Meta(ReviewSerializer.Meta):
+        read_only_fields = ('id', 'pub_date')
+        list_serializer_class = ReviewListSerializer
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for Comment model data."""
     author = serializers.SlugRelatedField(
@@ -68,16 +126,51 @@ class TitleReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = (
+            'id', 'name', 'year', 'rating',
+            'description', 'genre', 'category'
+        )
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """A title of a leaderboard with its place and weighted rating."""
+    rank = serializers.IntegerField(read_only=True)
+    title = TitleReadSerializer(read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ('rank', 'score', 'title')
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Query parameters of the leaderboards: one board and its length."""
+    category = serializers.SlugRelatedField(
+        queryset=Category.objects.all(),
+        slug_field='slug',
+        required=False
+    )
+    genre = serializers.SlugRelatedField(
+        queryset=Genre.objects.all(),
+        slug_field='slug',
+        required=False
+    )
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if 'category' in data and 'genre' in data:
+            raise serializers.ValidationError(
+                'Укажите либо категорию, либо жанр.'
+            )
+        return data
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Serializer to write Title model data."""
-    category = serializers.SlugRelatedField(
+    category = BatchedSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = BatchedSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True
@@ -85,7 +178,19 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+        list_serializer_class = BulkListSerializer
+
+
+class YaUserListSerializer(BulkListSerializer):
+
+    def create(self, validated_data):
+        # The codes go into the same insert as the users.
+        for item, code in zip(
+            validated_data, confirmation_codes(len(validated_data))
+        ):
+            item['confirmation_code'] = code
+        return super().create(validated_data)
 
 
 class YaUserSerializer(serializers.ModelSerializer):
@@ -97,6 +202,7 @@ class YaUserSerializer(serializers.ModelSerializer):
             'username', 'email', 'first_name',
             'last_name', 'bio', 'role'
         )
+        list_serializer_class = YaUserListSerializer
 
 
 class NotAdminSerializer(serializers.ModelSerializer):
@@ -110,6 +216,11 @@ class NotAdminSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'role',)
 
 
+class ExportQuerySerializer(serializers.Serializer):
+    """Query parameters of the export: only the rows changed since."""
+    updated_since = serializers.DateTimeField(required=False)
+
+
 class GetTokenSerializer(serializers.ModelSerializer):
     """Checking username and confirmation code before giving token."""
     username = serializers.CharField(
@@ -0,0 +1,47 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+from reviews.models import YaUser
+
+from .authentication import store_claims, user_claims
+from .cache import invalidate
+
+
+def is_reviews_model(model):
+    return model._meta.app_label == 'reviews'
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_model(sender, **kwargs):
+    if is_reviews_model(sender):
+        invalidate(sender)
+
+
+@receiver(m2m_changed)
+def invalidate_relation(sender, action, **kwargs):
+    if is_reviews_model(sender) and action.startswith('post_'):
+        invalidate(sender)
+
+
+def access_state(user):
+    return user_claims(user), user.__dict__.get('is_active')
+
+
+@receiver(post_init, sender=YaUser)
+def remember_access_state(sender, instance, **kwargs):
+    instance._access_state = access_state(instance)
+
+
+@receiver(post_save, sender=YaUser)
+def check_access_state(sender, instance, created, **kwargs):
+    state = access_state(instance)
+    if not created and state != instance._access_state:
+        claims, is_active = state
+        store_claims(instance.pk, claims if is_active else None)
+    instance._access_state = state
+
+
+@receiver(post_delete, sender=YaUser)
+def forget_access(sender, instance, **kwargs):
+    store_claims(instance.pk, None)
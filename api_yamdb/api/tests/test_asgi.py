@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.test import TransactionTestCase
+
+from api_yamdb.asgi import application
+
+
+class AsgiApplicationTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path):
+        async def exchange():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET', 'path': path,
+                'query_string': b'', 'http_version': '1.1', 'headers': [],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(5)
+            body = b''
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    return start['status'], body
+
+        return asyncio.run(exchange())
+
+    def test_read_endpoint(self):
+        finished = []
+
+        def on_finished(**kwargs):
+            finished.append(kwargs['sender'])
+
+        request_finished.connect(on_finished)
+        try:
+            status, body = self.get('/api/v1/genres/')
+        finally:
+            request_finished.disconnect(on_finished)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['results'], [])
+        self.assertEqual(len(finished), 1)
@@ -0,0 +1,124 @@
+from unittest import mock
+
+from api.authentication import (CLAIMS_KEY, ClaimsAccessToken,
+                                ClaimsJWTAuthentication, token_cache)
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import ADMIN, USER, YaUser
+
+
+@override_settings(
+    CACHE_SHARED=True, THROTTLE_STORE='api.throttling.CacheBucketStore'
+)
+class ClaimsAuthenticationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN,
+            bio='Администратор'
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def login(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issued_token_carries_claims(self):
+        response = self.client.post('/api/v1/auth/token/', {
+            'username': 'admin',
+            'confirmation_code': self.admin.confirmation_code
+        })
+        token = AccessToken(response.json()['token'])
+        self.assertEqual(token['role'], ADMIN)
+        self.assertEqual(token['username'], 'admin')
+        self.assertIs(token['is_staff'], False)
+
+    def test_user_is_built_from_claims(self):
+        token = ClaimsAccessToken.for_user(self.admin)
+        # The current claims of the user, then nothing until they expire.
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertEqual(user.pk, self.admin.pk)
+        self.assertTrue(user.is_admin)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.bio, 'Администратор')
+
+    def test_tokens_without_claims_read_the_user(self):
+        token = AccessToken.for_user(self.admin)
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+        self.assertTrue(user.is_admin)
+
+    def test_role_change_invalidates_claims(self):
+        token = ClaimsAccessToken.for_user(self.admin)
+        self.login(token)
+        self.assertEqual(self.client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'}
+        ).status_code, 201)
+
+        admin = YaUser.objects.get(pk=self.admin.pk)
+        admin.role = USER
+        admin.save()
+        self.assertEqual(self.client.post(
+            '/api/v1/genres/', {'name': 'Комедия', 'slug': 'comedy'}
+        ).status_code, 403)
+
+    def test_role_change_in_another_process(self):
+        self.login(ClaimsAccessToken.for_user(self.admin))
+        self.assertEqual(self.client.get('/api/v1/users/').status_code, 200)
+        # The token stays in the LRU of this process, only the claims
+        # in the shared cache tell about the change.
+        admin = YaUser.objects.get(pk=self.admin.pk)
+        admin.role = USER
+        with mock.patch.object(token_cache, 'evict_user'):
+            admin.save()
+        self.assertEqual(self.client.get('/api/v1/users/').status_code, 403)
+
+    def test_lost_claims_are_read_again(self):
+        self.login(ClaimsAccessToken.for_user(self.admin))
+        self.assertEqual(self.client.get('/api/v1/users/').status_code, 200)
+        # A change the cache lost, evicted or restarted since.
+        YaUser.objects.filter(pk=self.admin.pk).update(role=USER)
+        cache.delete(CLAIMS_KEY.format(self.admin.pk))
+        self.assertEqual(self.client.get('/api/v1/users/').status_code, 403)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_claims_need_a_shared_cache(self):
+        self.login(ClaimsAccessToken.for_user(self.admin))
+        YaUser.objects.filter(pk=self.admin.pk).update(role=USER)
+        self.assertEqual(self.client.get('/api/v1/users/').status_code, 403)
+
+    def test_deleted_user_is_rejected(self):
+        user = YaUser.objects.create(username='gone', email='g@yamdb.fake')
+        token = ClaimsAccessToken.for_user(user)
+        self.authenticate(token)
+        user.delete()
+        self.login(token)
+        self.assertEqual(
+            self.client.get('/api/v1/users/me/').status_code, 401
+        )
+
+    def test_me_uses_the_full_row(self):
+        self.login(ClaimsAccessToken.for_user(self.admin))
+        response = self.client.get('/api/v1/users/me/')
+        self.assertEqual(response.json()['bio'], 'Администратор')
+        response = self.client.patch(
+            '/api/v1/users/me/', {'bio': 'Модератор отзывов'}
+        )
+        self.assertEqual(response.json()['email'], 'admin@yamdb.fake')
+        self.assertEqual(
+            YaUser.objects.get(pk=self.admin.pk).bio, 'Модератор отзывов'
+        )
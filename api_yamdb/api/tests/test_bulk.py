@@ -0,0 +1,159 @@
+from api.authentication import ClaimsAccessToken
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from reviews.models import ADMIN, Category, Genre, Review, Title, YaUser
+
+
+@override_settings(THROTTLE_STORE='api.throttling.CacheBucketStore')
+class BulkCreateTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name='Фильм', slug='movie')
+        for slug in ('drama', 'comedy', 'crime'):
+            Genre.objects.create(name=slug, slug=slug)
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.title = Title.objects.create(name='Крестный отец', year=1972)
+
+    def setUp(self):
+        cache.clear()
+        self.login(self.admin)
+
+    def login(self, user):
+        token = ClaimsAccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def titles(self, count):
+        return [
+            {
+                'name': f'Фильм {number}', 'year': 2000 + number % 20,
+                'category': 'movie', 'genre': ['drama', 'crime'][:number % 3]
+            }
+            for number in range(count)
+        ]
+
+    def test_titles(self):
+        queries = []
+        for count in (2, 20):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.post(
+                    '/api/v1/titles/', self.titles(count), format='json'
+                )
+            self.assertEqual(response.status_code, 201)
+            queries.append(len(captured))
+        # One INSERT per extra row where bulk inserts give no ids back.
+        self.assertEqual(
+            queries[1] - queries[0],
+            0 if connection.features.can_return_ids_from_bulk_insert else 18
+        )
+        created = response.json()
+        self.assertEqual(len(created), 20)
+        title = Title.objects.get(pk=created[2]['id'])
+        self.assertEqual(
+            sorted(title.genre.values_list('slug', flat=True)),
+            ['crime', 'drama']
+        )
+        self.assertEqual(sorted(created[2]['genre']), ['crime', 'drama'])
+
+    def test_titles_without_returned_ids(self):
+        # Like any backend but PostgreSQL, SQLite inserts row by row.
+        response = self.client.post(
+            '/api/v1/titles/', self.titles(3), format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        for item in response.json():
+            title = Title.objects.get(pk=item['id'])
+            self.assertEqual(title.name, item['name'])
+            self.assertEqual(
+                sorted(title.genre.values_list('slug', flat=True)),
+                sorted(item['genre'])
+            )
+
+    def test_titles_errors_per_item(self):
+        payload = self.titles(3)
+        payload[1]['genre'] = ['western']
+        payload[2]['year'] = 3000
+        response = self.client.post(
+            '/api/v1/titles/', payload, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['genre'])
+        self.assertEqual(list(errors[2]), ['year'])
+        self.assertFalse(Title.objects.filter(name='Фильм 0').exists())
+
+    def test_single_title_still_works(self):
+        response = self.client.post(
+            '/api/v1/titles/', self.titles(2)[1], format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['genre'], ['drama'])
+
+    def test_users(self):
+        response = self.client.post('/api/v1/users/', [
+            {'username': 'first', 'email': 'first@yamdb.fake'},
+            {'username': 'first', 'email': 'other@yamdb.fake'},
+            {'username': 'second', 'email': 'reader@yamdb.fake'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['username'])
+        self.assertEqual(list(errors[2]), ['email'])
+
+        response = self.client.post('/api/v1/users/', [
+            {'username': 'first', 'email': 'first@yamdb.fake'},
+            {'username': 'second', 'email': 'second@yamdb.fake'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        codes = YaUser.objects.filter(
+            username__in=('first', 'second')
+        ).values_list('confirmation_code', flat=True)
+        self.assertEqual(len(set(codes)), 2)
+        self.assertNotIn('XXXX', codes)
+
+    def test_reviews(self):
+        url = f'/api/v1/titles/{self.title.id}/reviews/'
+        payload = [
+            {'author': 'admin', 'text': 'Шедевр', 'score': 10},
+            {'author': 'reader', 'text': 'Неплохо', 'score': 6},
+        ]
+        self.login(self.user)
+        self.assertEqual(self.client.post(
+            url, payload, format='json'
+        ).status_code, 403)
+
+        self.login(self.admin)
+        self.client.get(f'/api/v1/titles/{self.title.id}/')
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Review.objects.filter(title=self.title).count(), 2)
+        self.assertEqual(
+            self.client.get(f'/api/v1/titles/{self.title.id}/').json()[
+                'rating'
+            ],
+            8
+        )
+
+        response = self.client.post(url, payload[1:], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.json()[0])
+
+    def test_empty_list(self):
+        for url in (
+            '/api/v1/titles/', '/api/v1/users/',
+            f'/api/v1/titles/{self.title.id}/reviews/'
+        ):
+            with self.subTest(url=url):
+                response = self.client.post(url, [], format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('non_field_errors', response.json())
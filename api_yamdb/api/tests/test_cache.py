@@ -0,0 +1,128 @@
+from unittest import mock
+
+from api.views import GenreViewSet
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import ADMIN, Category, Genre, Review, Title, YaUser
+
+
+@override_settings(
+    CACHE_SHARED=True, THROTTLE_STORE='api.throttling.CacheBucketStore'
+)
+class ResponseCacheTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Фильм', slug='movie')
+        cls.genre = Genre.objects.create(name='Драма', slug='drama')
+        cls.title = Title.objects.create(
+            name='Крестный отец', year=1972, category=cls.category
+        )
+        cls.title.genre.set([cls.genre])
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.title_url = f'/api/v1/titles/{cls.title.id}/'
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeated_requests_skip_the_database(self):
+        for url in (
+            '/api/v1/titles/', self.title_url, '/api/v1/categories/',
+            '/api/v1/genres/', f'{self.title_url}reviews/'
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_hits_skip_the_handler(self):
+        with mock.patch.object(
+            GenreViewSet, 'list', autospec=True, side_effect=GenreViewSet.list
+        ) as handler:
+            first = self.client.get('/api/v1/genres/')
+            second = self.client.get('/api/v1/genres/')
+        self.assertEqual(handler.call_count, 1)
+        self.assertEqual(second.content, first.content)
+
+    def test_keys_vary_on_query_string(self):
+        self.client.get('/api/v1/titles/?year=1972')
+        response = self.client.get('/api/v1/titles/?year=1973')
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_writes_invalidate(self):
+        self.client.get('/api/v1/categories/')
+        self.client.get(self.title_url)
+        Category.objects.create(name='Книга', slug='book')
+        self.assertEqual(
+            self.client.get('/api/v1/categories/').json()['count'], 2
+        )
+
+        Review.objects.create(
+            title=self.title, author=self.user, text='Шедевр', score=10
+        )
+        self.assertEqual(self.client.get(self.title_url).json()['rating'], 10)
+
+        self.title.genre.clear()
+        self.assertEqual(self.client.get(self.title_url).json()['genre'], [])
+
+    def test_not_modified(self):
+        response = self.client.get(self.title_url)
+        self.assertIn('stale-while-revalidate', response['Cache-Control'])
+        for _ in range(2):
+            not_modified = self.client.get(
+                self.title_url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.title.name = 'Крестный отец 2'
+        self.title.save()
+        changed = self.client.get(
+            self.title_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_roles_do_not_share_entries(self):
+        self.client.get('/api/v1/genres/')
+        self.login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/genres/')
+        self.assertTrue(
+            [query for query in queries if 'reviews_genre' in query['sql']]
+        )
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_writes_are_not_cached(self):
+        self.login(self.admin)
+        response = self.client.post(
+            '/api/v1/genres/', {'name': 'Комедия', 'slug': 'comedy'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('ETag', response)
+
+    def test_disabled(self):
+        for setting in (
+            {'RESPONSE_CACHE_TIMEOUT': 0}, {'CACHE_SHARED': False}
+        ):
+            with self.subTest(**setting), override_settings(**setting):
+                self.client.get('/api/v1/genres/')
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get('/api/v1/genres/')
+                self.assertTrue(queries)
+                self.assertNotIn('ETag', response)
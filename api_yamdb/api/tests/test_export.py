@@ -0,0 +1,118 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from api.authentication import ClaimsAccessToken
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from reviews.models import ADMIN, Category, Genre, Review, Title, YaUser
+
+
+class ExportTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        crime = Genre.objects.create(name='Криминал', slug='crime')
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.titles = []
+        for number in range(5):
+            title = Title.objects.create(
+                name=f'Фильм {number}', year=1970 + number, category=movie
+            )
+            title.genre.set([drama, crime] if number % 2 else [drama])
+            cls.titles.append(title)
+        for user, score in ((cls.admin, 10), (cls.user, 7)):
+            Review.objects.create(
+                title=cls.titles[0], author=user, text='Отзыв', score=score
+            )
+
+    def setUp(self):
+        cache.clear()
+        token = ClaimsAccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def export(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2, EXPORT_BUFFER_SIZE=100)
+    def test_ndjson(self):
+        lines = self.export('/api/v1/export/titles/').decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['id'] for row in rows], [title.pk for title in self.titles]
+        )
+        self.assertEqual(rows[0]['rating'], 8.5)
+        self.assertEqual(rows[0]['review_count'], 2)
+        self.assertEqual(rows[0]['category'], 'movie')
+        self.assertEqual(rows[1]['genre'], ['crime', 'drama'])
+        self.assertIsNone(rows[1]['rating'])
+
+        rows = self.export('/api/v1/export/reviews/').decode().splitlines()
+        self.assertEqual(
+            [json.loads(row)['author'] for row in rows], ['admin', 'reader']
+        )
+
+    def test_csv_gzip(self):
+        data = self.export(
+            '/api/v1/export/titles/?format=csv', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        rows = list(csv.DictReader(
+            io.StringIO(gzip.decompress(data).decode())
+        ))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]['genre'], 'crime,drama')
+        self.assertEqual(rows[0]['name'], 'Фильм 0')
+
+        response = self.client.get(
+            '/api/v1/export/reviews/', HTTP_ACCEPT='text/csv'
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_updated_since(self):
+        since = timezone.now() + timedelta(seconds=1)
+        Title.objects.filter(pk=self.titles[2].pk).update(
+            updated_at=since + timedelta(seconds=1)
+        )
+        data = self.export(
+            '/api/v1/export/titles/',
+            data={'updated_since': since.isoformat()}
+        )
+        self.assertEqual(
+            [json.loads(line)['id'] for line in data.decode().splitlines()],
+            [self.titles[2].pk]
+        )
+        self.assertEqual(
+            self.client.get(
+                '/api/v1/export/titles/?updated_since=вчера'
+            ).status_code,
+            400
+        )
+
+    def test_only_for_admins(self):
+        self.assertEqual(
+            self.client.get('/api/v1/export/users/').status_code, 404
+        )
+        token = ClaimsAccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(
+            self.client.get('/api/v1/export/titles/').status_code, 403
+        )
+        self.client.credentials()
+        self.assertEqual(
+            self.client.get('/api/v1/export/titles/').status_code, 401
+        )
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from reviews.models import Category, Genre, Title
+
+
+class TitleFilterTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        movies = Category.objects.create(name='Фильмы', slug='movies')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        crime = Genre.objects.create(name='Криминал', slug='crime')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        for name, year, category, genres in (
+            ('Крестный отец', 1972, movie, (drama, crime)),
+            ('Побег из Шоушенка', 1994, movie, (drama,)),
+            ('Большой Лебовски', 1998, movies, (comedy, crime)),
+        ):
+            title = Title.objects.create(
+                name=name, year=year, category=category
+            )
+            title.genre.set(genres)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, query):
+        response = self.client.get(f'/api/v1/titles/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.json()['results'])
+
+    def test_category_is_exact(self):
+        self.assertEqual(
+            self.names('category=movie'),
+            ['Крестный отец', 'Побег из Шоушенка']
+        )
+
+    def test_any_genre(self):
+        self.assertEqual(
+            self.names('genre=crime,comedy'),
+            ['Большой Лебовски', 'Крестный отец']
+        )
+        response = self.client.get('/api/v1/titles/?genre=drama,crime')
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_all_genres(self):
+        self.assertEqual(
+            self.names('genre_all=drama,crime'), ['Крестный отец']
+        )
+        self.assertEqual(self.names('genre_all=drama,comedy'), [])
+
+    def test_year(self):
+        self.assertEqual(self.names('year=1994'), ['Побег из Шоушенка'])
+        self.assertEqual(self.names('year=199'), [])
+        self.assertEqual(
+            self.names('year_min=1990&year_max=1995'), ['Побег из Шоушенка']
+        )
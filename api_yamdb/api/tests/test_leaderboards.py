@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from reviews.models import (Category, Genre, LeaderboardEntry, Review, Title,
+                            YaUser)
+
+
+@override_settings(LEADERBOARD_PRIOR_SCORE=5.0, LEADERBOARD_PRIOR_REVIEWS=2)
+class LeaderboardTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Category.objects.create(name='Фильм', slug='movie')
+        cls.book = Category.objects.create(name='Книга', slug='book')
+        cls.drama = Genre.objects.create(name='Драма', slug='drama')
+        cls.users = [
+            YaUser.objects.create(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.godfather = Title.objects.create(
+            name='Крестный отец', year=1972, category=self.movie
+        )
+        self.godfather.genre.set([self.drama])
+        self.novel = Title.objects.create(
+            name='Война и мир', year=1869, category=self.book
+        )
+        # Four good reviews outweigh one perfect score.
+        for user in self.users:
+            self.review(self.godfather, user, 9)
+        self.review(self.novel, self.users[0], 10)
+
+    def review(self, title, user, score):
+        return Review.objects.create(
+            title=title, author=user, text='Отзыв', score=score
+        )
+
+    def board(self, **params):
+        response = self.client.get('/api/v1/leaderboards/', params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (entry['rank'], entry['title']['name'], entry['score'])
+            for entry in response.json()
+        ]
+
+    def test_boards(self):
+        self.assertEqual(self.board(), [
+            (1, 'Крестный отец', (36 + 10) / 6),
+            (2, 'Война и мир', (10 + 10) / 3),
+        ])
+        self.assertEqual(self.board(limit=1), [
+            (1, 'Крестный отец', (36 + 10) / 6)
+        ])
+        self.assertEqual(
+            [name for _, name, _ in self.board(category='book')],
+            ['Война и мир']
+        )
+        self.assertEqual(
+            [name for _, name, _ in self.board(genre='drama')],
+            ['Крестный отец']
+        )
+        for params in (
+            {'genre': 'none'}, {'genre': 'drama', 'category': 'book'}
+        ):
+            response = self.client.get('/api/v1/leaderboards/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_follows_reviews_and_titles(self):
+        for user in self.users[1:]:
+            self.review(self.novel, user, 10)
+        self.assertEqual(self.board()[0][1], 'Война и мир')
+
+        Review.objects.filter(title=self.novel).first().delete()
+        self.assertEqual(self.board()[0][2], (30 + 10) / 5)
+
+        self.novel.category = self.movie
+        self.novel.save()
+        self.novel.genre.add(self.drama)
+        self.assertEqual(len(self.board(category='movie')), 2)
+        self.assertEqual(len(self.board(genre='drama')), 2)
+        self.assertEqual(self.board(category='book'), [])
+
+        for review in Review.objects.filter(title=self.novel):
+            review.delete()
+        self.assertEqual(self.board(genre='drama')[0][1], 'Крестный отец')
+        self.assertFalse(self.novel.leaderboard_entries.exists())
+
+        self.godfather.delete()
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_refresh_command(self):
+        LeaderboardEntry.objects.all().delete()
+        with override_settings(LEADERBOARD_PRIOR_REVIEWS=0):
+            call_command('refresh_leaderboards', stdout=StringIO())
+        self.assertEqual(self.board(), [
+            (1, 'Война и мир', 10.0),
+            (2, 'Крестный отец', 9.0),
+        ])
+        self.assertEqual(LeaderboardEntry.objects.count(), 5)
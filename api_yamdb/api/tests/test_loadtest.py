@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+
+from api.management.commands.loadtest import Command, compare, percentile
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+from reviews.models import Review, Title, YaUser
+
+
+def report(p95, requests=100, error_rate=0.0, rps=50.0):
+    return {'routes': {'titles-list': {
+        'requests': requests, 'error_rate': error_rate, 'rps': rps,
+        'p50_ms': 10.0, 'p95_ms': p95, 'p99_ms': 40.0,
+    }}}
+
+
+class LoadTestReportTest(SimpleTestCase):
+
+    def test_percentile(self):
+        latencies = list(range(1, 101))
+        self.assertEqual(percentile(latencies, 0.50), 50)
+        self.assertEqual(percentile(latencies, 0.95), 95)
+        self.assertEqual(percentile(latencies, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_compare(self):
+        self.assertEqual(compare(report(20.0), report(21.0), 0.1), [])
+        self.assertEqual(
+            compare(report(20.0), report(30.0), 0.1),
+            ['titles-list: p95_ms 20.0 -> 30.0']
+        )
+        self.assertEqual(len(compare(
+            report(20.0), report(20.0, error_rate=0.05, rps=30.0), 0.1
+        )), 2)
+        self.assertEqual(compare(
+            report(20.0, requests=10), report(30.0, requests=10), 0.1, 50
+        ), [])
+
+    def test_invalid_mix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mix.json')
+            for mix, authenticated in (
+                ({}, True),
+                ({'titles-list': 0}, True),
+                ({'titles-list': -1, 'genres-list': 1}, True),
+                ({'titles-list': 'a lot'}, True),
+                (['titles-list'], True),
+                ({'reviews-create': 5}, False),
+            ):
+                with open(path, 'w', encoding='utf-8') as file:
+                    json.dump(mix, file)
+                with self.subTest(mix=mix), self.assertRaises(CommandError):
+                    Command.mix(path, authenticated)
+            self.assertEqual(
+                Command.mix(path, True), {'reviews-create': 5}
+            )
+
+
+@override_settings(THROTTLE_STORE='api.throttling.CacheBucketStore')
+class LoadTestRunTest(LiveServerTestCase):
+
+    def setUp(self):
+        user = YaUser.objects.create(username='reader', email='r@yamdb.fake')
+        YaUser.objects.create(username='writer', email='w@yamdb.fake')
+        title = Title.objects.create(name='Крестный отец', year=1972)
+        Review.objects.create(title=title, author=user, text='Да', score=9)
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            call_command(
+                'loadtest', url=self.live_server_url, duration=1,
+                concurrency=1, mint_tokens=2, output=baseline
+            )
+            with open(baseline, encoding='utf-8') as file:
+                routes = json.load(file)['routes']
+            self.assertIn('titles-list', routes)
+            for stats in routes.values():
+                self.assertEqual(stats['errors'], 0)
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+            faster = {'routes': {
+                route: dict(stats, p95_ms=0.0)
+                for route, stats in routes.items()
+            }}
+            with open(baseline, 'w', encoding='utf-8') as file:
+                json.dump(faster, file)
+            with self.assertRaises(CommandError):
+                call_command(
+                    'loadtest', url=self.live_server_url, duration=1,
+                    concurrency=1, min_requests=1, compare=baseline,
+                    output=os.path.join(directory, 'current.json')
+                )
@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+import time
+
+from api.metrics import BUCKETS, registry
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from reviews.models import Genre
+
+LABELS = 'route="api:genres-list",method="GET"'
+
+
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Genre.objects.create(name='Драма', slug='drama')
+
+    def setUp(self):
+        cache.clear()
+        registry.routes = {}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_TOKEN='secret'
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def scrape(self):
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_routes_of_every_worker(self):
+        for _ in range(2):
+            self.client.get('/api/v1/genres/')
+        self.client.get('/api/v1/titles/999/')
+        with open(
+            os.path.join(self.directory, 'other-1.json'), 'w',
+            encoding='utf-8'
+        ) as file:
+            json.dump({'routes': [{
+                'route': 'api:genres-list', 'method': 'GET', 'count': 1,
+                'seconds': 20.0, 'buckets': [0] * len(BUCKETS) + [1],
+                'statuses': {'200': 1}, 'queries': 3, 'sql_seconds': 0.5,
+            }], 'pools': {}}, file)
+
+        text = self.scrape()
+        self.assertIn(
+            f'api_requests_total{{{LABELS},status="200"}} 3', text
+        )
+        self.assertIn(
+            'api_requests_total{route="api:titles-detail",method="GET",'
+            'status="404"} 1',
+            text
+        )
+        self.assertIn(
+            f'api_request_duration_seconds_bucket{{{LABELS},le="10"}} 2',
+            text
+        )
+        self.assertIn(
+            f'api_request_duration_seconds_bucket{{{LABELS},le="+Inf"}} 3',
+            text
+        )
+        line = next(
+            line for line in text.splitlines()
+            if line.startswith(f'api_sql_queries_total{{{LABELS}}}')
+        )
+        self.assertGreaterEqual(int(line.split()[-1]), 5)
+
+    def test_dead_workers(self):
+        path = os.path.join(self.directory, 'other-1.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'routes': [{
+                'route': 'api:genres-list', 'method': 'GET', 'count': 1,
+                'seconds': 0.001, 'buckets': [1] + [0] * len(BUCKETS),
+                'statuses': {'200': 1}, 'queries': 3, 'sql_seconds': 0.5,
+            }], 'pools': {'other': {
+                'in_use': 7, 'idle': 0, 'size': 7, 'connects': 2,
+                'checkouts': 9, 'waits': 0, 'wait_seconds': 0.0,
+                'timeouts': 0, 'failed_checks': 0, 'recycled': 0,
+            }}}, file)
+        self.client.get('/api/v1/genres/')
+        alive = self.scrape()
+        self.assertIn('db_pool_in_use{database="other"} 7', alive)
+
+        long_ago = time.time() - 60
+        os.utime(path, (long_ago, long_ago))
+        dead = self.scrape()
+        for line in (
+            f'api_requests_total{{{LABELS},status="200"}} 2',
+            'db_pool_connects_total{database="other"} 2',
+        ):
+            self.assertIn(line, alive)
+            self.assertIn(line, dead)
+        self.assertIn('db_pool_in_use{database="other"} 0', dead)
+
+    def test_families_are_contiguous(self):
+        self.client.get('/api/v1/genres/')
+        self.client.get('/api/v1/titles/999/')
+        family = None
+        for line in self.scrape().splitlines():
+            if line.startswith('# TYPE '):
+                family = line.split()[2]
+                continue
+            self.assertTrue(line.startswith(family), line)
+            name = line.split('{')[0]
+            self.assertIn(
+                name[len(family):], ('', '_bucket', '_sum', '_count')
+            )
+
+    def test_protected(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer '
+            ).status_code, 404)
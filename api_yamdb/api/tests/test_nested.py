@@ -0,0 +1,70 @@
+from api.authentication import ClaimsAccessToken, current_claims
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from reviews.models import Comment, Review, Title, YaUser
+
+
+@override_settings(
+    CACHE_SHARED=True, THROTTLE_STORE='api.throttling.CacheBucketStore'
+)
+class NestedRouteTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.title = Title.objects.create(name='Крестный отец', year=1972)
+        cls.other_title = Title.objects.create(name='Амели', year=2001)
+        cls.review = Review.objects.create(
+            title=cls.title, author=cls.user, text='Шедевр', score=10
+        )
+        cls.comment = Comment.objects.create(
+            review=cls.review, author=cls.user, text='Согласен'
+        )
+        cls.missing = cls.other_title.id + 1
+
+    def setUp(self):
+        cache.clear()
+        token = ClaimsAccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def comments_url(self, title_id):
+        return f'/api/v1/titles/{title_id}/reviews/{self.review.id}/comments/'
+
+    def test_lists_of_missing_parents(self):
+        self.assertEqual(self.client.get(
+            f'/api/v1/titles/{self.missing}/reviews/'
+        ).status_code, 404)
+        response = self.client.get(
+            f'/api/v1/titles/{self.other_title.id}/reviews/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_review_must_belong_to_title(self):
+        wrong_url = self.comments_url(self.other_title.id)
+        self.assertEqual(self.client.get(wrong_url).status_code, 404)
+        self.assertEqual(self.client.get(
+            f'{wrong_url}{self.comment.id}/'
+        ).status_code, 404)
+        self.assertEqual(self.client.post(
+            wrong_url, {'text': 'Мимо'}
+        ).status_code, 404)
+        self.assertEqual(self.client.get(
+            self.comments_url(self.title.id)
+        ).json()['count'], 1)
+
+    def test_create_checks_parent_once(self):
+        current_claims(self.user.pk)
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.comments_url(self.title.id), {'text': 'И я'}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        self.assertEqual(self.client.post(
+            f'/api/v1/titles/{self.missing}/reviews/',
+            {'text': 'Нет такого', 'score': 5}
+        ).status_code, 404)
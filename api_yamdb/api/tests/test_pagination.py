@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from reviews.models import Review, Title, YaUser
+
+
+class PaginationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.title = Title.objects.create(name='Крестный отец', year=1972)
+        cls.users = [
+            YaUser.objects.create(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+            for number in range(8)
+        ]
+        for user in cls.users[:7]:
+            Review.objects.create(
+                title=cls.title, author=user, text='Отзыв', score=5
+            )
+        cls.url = f'/api/v1/titles/{cls.title.id}/reviews/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_offset_pages_keep_count(self):
+        response = self.client.get(f'{self.url}?limit=3')
+        self.assertEqual(response.json()['count'], 7)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_offset_count_is_cached(self):
+        self.client.get(f'{self.url}?limit=3')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'{self.url}?limit=3&offset=3')
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+
+    def test_cursor_pages(self):
+        response = self.client.get(f'{self.url}?pagination=cursor&limit=3')
+        page = response.json()
+        self.assertNotIn('count', page)
+        seen = [review['id'] for review in page['results']]
+        Review.objects.create(
+            title=self.title, author=self.users[7], text='Новый', score=1
+        )
+        while page['next']:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(page['next']).json()
+            self.assertFalse(
+                [query for query in queries if 'COUNT(' in query['sql']]
+            )
+            seen += [review['id'] for review in page['results']]
+        expected = list(
+            Review.objects.order_by('pub_date', 'id').values_list(
+                'id', flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
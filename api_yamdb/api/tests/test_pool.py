@@ -0,0 +1,112 @@
+import threading
+from unittest import mock
+
+from api.authentication import ClaimsAccessToken
+from api.db import pool
+from api.db.pool import ConnectionPool, PoolTimeoutError
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from reviews.models import ADMIN, YaUser
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.broken = False
+        self.in_transaction = False
+        self.closed = False
+
+
+class FakePool(ConnectionPool):
+
+    def connect(self):
+        return FakeConnection()
+
+    def check(self, connection):
+        if connection.broken:
+            raise ConnectionError('server closed the connection')
+
+    def reset(self, connection):
+        connection.in_transaction = False
+        return not connection.broken
+
+    def close(self, connection):
+        connection.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_reuse(self):
+        connections = FakePool(size=2)
+        first = connections.acquire()
+        first.in_transaction = True
+        connections.release(first)
+        self.assertIs(connections.acquire(), first)
+        self.assertFalse(first.in_transaction)
+        self.assertEqual(connections.snapshot()['connects'], 1)
+
+    def test_waits_for_a_free_connection(self):
+        connections = FakePool(size=1, timeout=5)
+        first = connections.acquire()
+        timer = threading.Timer(0.05, connections.release, (first,))
+        timer.start()
+        self.assertIs(connections.acquire(), first)
+        timer.join()
+        stats = connections.snapshot()
+        self.assertEqual((stats['waits'], stats['in_use']), (1, 1))
+        self.assertGreater(stats['wait_seconds'], 0)
+
+        connections.timeout = 0.01
+        with self.assertRaises(PoolTimeoutError):
+            connections.acquire()
+        self.assertEqual(connections.snapshot()['timeouts'], 1)
+
+    def test_broken_connection_is_replaced(self):
+        connections = FakePool(size=2)
+        first = connections.acquire()
+        connections.release(first)
+        first.broken = True
+        second = connections.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        stats = connections.snapshot()
+        self.assertEqual((stats['failed_checks'], stats['in_use']), (1, 1))
+
+    def test_old_connection_is_recycled(self):
+        connections = FakePool(size=2, max_lifetime=60)
+        with mock.patch('time.monotonic', return_value=1000):
+            first = connections.acquire()
+            connections.release(first)
+        with mock.patch('time.monotonic', return_value=1100):
+            self.assertIsNot(connections.acquire(), first)
+        self.assertTrue(first.closed)
+        self.assertEqual(connections.snapshot()['recycled'], 1)
+
+    def test_fork_drops_parent_connections(self):
+        connections = FakePool(size=1)
+        first = connections.acquire()
+        connections.release(first)
+        with mock.patch('os.getpid', return_value=connections.pid + 1):
+            second = connections.acquire()
+            self.assertIsNot(second, first)
+            self.assertEqual(connections.snapshot()['in_use'], 1)
+        self.assertFalse(first.closed)
+        self.assertIn(first, pool.orphaned)
+        pool.orphaned.remove(first)
+
+
+class DatabasePoolViewTest(APITestCase):
+
+    def test_admin_only(self):
+        admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        self.assertEqual(self.client.get('/api/v1/db-pool/').status_code, 401)
+        for account, status in ((user, 403), (admin, 200)):
+            token = ClaimsAccessToken.for_user(account)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            response = self.client.get('/api/v1/db-pool/')
+            self.assertEqual(response.status_code, status)
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+
+from api.authentication import ClaimsAccessToken
+from api.profiling import profiling
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from reviews.models import ADMIN, Genre, YaUser
+
+
+class ProfilingTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Genre.objects.create(name='Драма', slug='drama')
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, user):
+        token = ClaimsAccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_report(self):
+        self.login(self.admin)
+        response = self.client.get('/api/v1/genres/?profile=1')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['status'], 200)
+        self.assertEqual(report['path'], '/api/v1/genres/?profile=1')
+        self.assertTrue(any(
+            'reviews_genre' in query['sql'] for query in report['queries']
+        ))
+        self.assertTrue(report['functions'])
+        self.assertIn('allocations', report)
+
+    def test_store(self):
+        self.login(self.admin)
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILE_DIR=directory):
+                response = self.client.get(
+                    '/api/v1/genres/', HTTP_X_PROFILE='store'
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'][0]['slug'], 'drama')
+            path = os.path.join(
+                directory, f'{response["X-Profile-Id"]}.json'
+            )
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(json.load(file)['status'], 200)
+
+    def test_one_at_a_time(self):
+        self.login(self.admin)
+        with profiling:
+            response = self.client.get('/api/v1/genres/?profile=1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(
+            self.client.get('/api/v1/genres/?profile=1').json()['status'],
+            200
+        )
+
+    def test_only_for_admins(self):
+        for user in (None, self.user):
+            if user is not None:
+                self.login(user)
+            response = self.client.get(
+                '/api/v1/genres/?profile=1', HTTP_X_PROFILE='store'
+            )
+            self.assertIn('results', response.json())
+            self.assertFalse(response.has_header('X-Profile-Id'))
@@ -0,0 +1,306 @@
+import json
+import os
+from contextlib import contextmanager
+
+from api.authentication import ClaimsAccessToken, current_claims, token_cache
+from api.metrics import SQLRecorder
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from reviews.models import (ADMIN, Category, Comment, Genre, Review, Title,
+                            YaUser)
+
+PAGE_SIZES = (1, 5, 25)
+REPORT_PATH = os.getenv('QUERY_BUDGET_REPORT')
+SQL_TIME_BUDGET_MS = float(os.getenv('QUERY_BUDGET_SQL_MS', 0))
+
+
+# Measured as deployed, with a cache shared by the workers.
+@override_settings(
+    CACHE_SHARED=True, THROTTLE_STORE='api.throttling.CacheBucketStore'
+)
+class QueryBudgetTest(APITestCase):
+    """Every route runs exactly its budgeted number of queries.
+
+    List routes run as many whatever the page. A change of a count, up
+    or down, has to update the budget here.
+
+    Set QUERY_BUDGET_REPORT to a file name to get the measured query
+    counts and SQL time per endpoint as JSON, and QUERY_BUDGET_SQL_MS to
+    fail on endpoints spending more milliseconds than that in SQL.
+    """
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [
+            Category.objects.create(name=name, slug=slug)
+            for name, slug in (
+                ('Фильм', 'movie'), ('Книга', 'book'), ('Музыка', 'music')
+            )
+        ]
+        genres = [
+            Genre.objects.create(name=f'Жанр {number}', slug=f'genre{number}')
+            for number in range(6)
+        ]
+        cls.admin = YaUser.objects.create(
+            username='admin', email='admin@yamdb.fake', role=ADMIN
+        )
+        cls.users = [
+            YaUser.objects.create(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+            for number in range(30)
+        ]
+        cls.titles = []
+        for number in range(30):
+            title = Title.objects.create(
+                name=f'Произведение {number}',
+                year=1950 + number,
+                category=categories[number % len(categories)]
+            )
+            title.genre.set(genres[number % 4:number % 4 + 2])
+            cls.titles.append(title)
+        cls.title = cls.titles[0]
+        cls.reviews = [
+            Review.objects.create(
+                title=cls.title, author=user, text='Отзыв', score=7
+            )
+            for user in cls.users[:-1]
+        ]
+        cls.review = cls.reviews[0]
+        cls.comments = [
+            Comment.objects.create(
+                review=cls.review, author=user, text='Комментарий'
+            )
+            for user in cls.users
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if REPORT_PATH:
+            with open(REPORT_PATH, 'w', encoding='utf-8') as report:
+                json.dump(cls.report, report, indent=2, sort_keys=True)
+
+    def login(self, user):
+        if user is None:
+            self.client.credentials()
+            return
+        token = ClaimsAccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    @contextmanager
+    def recording(self):
+        recorder = SQLRecorder()
+        with connection.execute_wrapper(recorder):
+            yield recorder
+
+    def measure(self, name, method, url, user=None, expected=200, **kwargs):
+        self.login(user)
+        cache.clear()
+        token_cache.clear()
+        if user is not None:
+            # Read once in AUTH_TOKEN_CACHE_TTL, not on every request.
+            current_claims(user.pk)
+        with self.recording() as recorder:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertEqual(
+            response.status_code, expected,
+            f'{name}: {method.upper()} {url} answered {response.status_code}'
+        )
+        milliseconds = recorder.seconds * 1000
+        self.report.setdefault(name, []).append({
+            'url': url,
+            'queries': recorder.count,
+            'sql_ms': round(milliseconds, 3),
+        })
+        if SQL_TIME_BUDGET_MS:
+            self.assertLessEqual(
+                milliseconds, SQL_TIME_BUDGET_MS,
+                f'{name} spent {milliseconds:.1f} ms in SQL'
+            )
+        return recorder.count
+
+    def assert_budget(self, name, budget, method, url, **kwargs):
+        queries = self.measure(name, method, url, **kwargs)
+        self.assertEqual(
+            queries, budget,
+            f'{name} ran {queries} queries, the budget is {budget}'
+        )
+
+    def assert_list_budget(self, name, budget, url, user=None):
+        counts = {
+            limit: self.measure(
+                name, 'get', f'{url}?limit={limit}', user=user
+            )
+            for limit in PAGE_SIZES
+        }
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'{name} query count grows with page size: {counts}'
+        )
+        self.assertEqual(
+            max(counts.values()), budget,
+            f'{name} ran {counts} queries, the budget is {budget}'
+        )
+
+    def test_catalog_lists(self):
+        self.assert_list_budget('titles-list', 3, '/api/v1/titles/')
+        self.assert_list_budget('categories-list', 2, '/api/v1/categories/')
+        self.assert_list_budget('genres-list', 2, '/api/v1/genres/')
+
+    def test_nested_lists(self):
+        title_url = f'/api/v1/titles/{self.title.id}'
+        self.assert_list_budget(
+            'reviews-list', 2, f'{title_url}/reviews/'
+        )
+        self.assert_list_budget(
+            'comments-list', 2,
+            f'{title_url}/reviews/{self.review.id}/comments/'
+        )
+
+    def test_users_list(self):
+        self.assert_list_budget(
+            'users-list', 2, '/api/v1/users/', user=self.admin
+        )
+
+    def test_details(self):
+        title_url = f'/api/v1/titles/{self.title.id}'
+        review_url = f'{title_url}/reviews/{self.review.id}'
+        self.assert_budget('titles-detail', 2, 'get', f'{title_url}/')
+        self.assert_budget('reviews-detail', 1, 'get', f'{review_url}/')
+        self.assert_budget(
+            'comments-detail', 1, 'get',
+            f'{review_url}/comments/{self.comments[0].id}/'
+        )
+        self.assert_budget(
+            'users-me', 1, 'get', '/api/v1/users/me/', user=self.users[0]
+        )
+
+    def test_review_writes(self):
+        title_url = f'/api/v1/titles/{self.title.id}'
+        # Both score changes rescore the leaderboard entries of the title
+        # and count the review in the rollups: one UPDATE per rollup row,
+        # three for a row that does not exist yet, like the score 5 here.
+        # Updates lock the review and read the score counted so far.
+        self.assert_budget(
+            'reviews-create', 10, 'post', f'{title_url}/reviews/',
+            user=self.users[-1], expected=201,
+            data={'text': 'Новый отзыв', 'score': 5}
+        )
+        self.assert_budget(
+            'reviews-update', 12, 'patch',
+            f'{title_url}/reviews/{self.review.id}/',
+            user=self.review.author, data={'score': 3}
+        )
+        self.assert_budget(
+            'reviews-update-moderated', 5, 'patch',
+            f'{title_url}/reviews/{self.review.id}/',
+            user=self.admin, data={'text': 'Исправлено'}
+        )
+        review = self.reviews[1]
+        self.assert_budget(
+            'reviews-delete', 9, 'delete',
+            f'{title_url}/reviews/{review.id}/',
+            user=review.author, expected=204
+        )
+
+    def test_comment_writes(self):
+        comments_url = (
+            f'/api/v1/titles/{self.title.id}'
+            f'/reviews/{self.review.id}/comments/'
+        )
+        self.assert_budget(
+            'comments-create', 2, 'post', comments_url,
+            user=self.users[1], expected=201,
+            data={'text': 'Новый комментарий'}
+        )
+        comment = self.comments[1]
+        self.assert_budget(
+            'comments-update', 2, 'patch', f'{comments_url}{comment.id}/',
+            user=comment.author, data={'text': 'Исправленный комментарий'}
+        )
+        comment = self.comments[2]
+        self.assert_budget(
+            'comments-delete', 2, 'delete', f'{comments_url}{comment.id}/',
+            user=comment.author, expected=204
+        )
+
+    def test_catalog_writes(self):
+        # The genres check whether the title is on the leaderboards.
+        self.assert_budget(
+            'titles-create', 9, 'post', '/api/v1/titles/',
+            user=self.admin, expected=201,
+            data={
+                'name': 'Новое произведение', 'year': 2000,
+                'category': 'book', 'genre': ['genre1', 'genre2']
+            }
+        )
+        # The save, the removed and the added genres each rebuild the
+        # leaderboard entries of the reviewed title.
+        self.assert_budget(
+            'titles-update', 30, 'patch', f'/api/v1/titles/{self.title.id}/',
+            user=self.admin, format='json',
+            data={'name': 'Переименовано', 'genre': ['genre3']}
+        )
+        self.assert_budget(
+            'titles-delete', 10, 'delete',
+            f'/api/v1/titles/{self.titles[1].id}/',
+            user=self.admin, expected=204
+        )
+        self.assert_budget(
+            'categories-create', 2, 'post', '/api/v1/categories/',
+            user=self.admin, expected=201,
+            data={'name': 'Игра', 'slug': 'game'}
+        )
+        self.assert_budget(
+            'categories-delete', 5, 'delete', '/api/v1/categories/music/',
+            user=self.admin, expected=204
+        )
+        self.assert_budget(
+            'genres-create', 2, 'post', '/api/v1/genres/',
+            user=self.admin, expected=201,
+            data={'name': 'Жанр 6', 'slug': 'genre6'}
+        )
+        self.assert_budget(
+            'genres-delete', 5, 'delete', '/api/v1/genres/genre5/',
+            user=self.admin, expected=204
+        )
+        self.assert_budget(
+            'users-me-update', 2, 'patch', '/api/v1/users/me/',
+            user=self.users[0], data={'bio': 'Люблю кино'}
+        )
+
+    def test_user_writes(self):
+        self.assert_budget(
+            'users-create', 3, 'post', '/api/v1/users/',
+            user=self.admin, expected=201,
+            data={'username': 'created', 'email': 'created@yamdb.fake'}
+        )
+        self.assert_budget(
+            'users-detail', 1, 'get', '/api/v1/users/user0/', user=self.admin
+        )
+        self.assert_budget(
+            'users-update', 2, 'patch', '/api/v1/users/user0/',
+            user=self.admin, data={'role': 'moderator'}
+        )
+        self.assert_budget(
+            'users-delete', 8, 'delete', '/api/v1/users/user29/',
+            user=self.admin, expected=204
+        )
+
+    def test_auth(self):
+        self.assert_budget(
+            'auth-signup', 6, 'post', '/api/v1/auth/signup/',
+            data={'username': 'newcomer', 'email': 'newcomer@yamdb.fake'}
+        )
+        user = self.users[0]
+        self.assert_budget(
+            'auth-token', 1, 'post', '/api/v1/auth/token/', expected=201,
+            data={
+                'username': user.username,
+                'confirmation_code': user.confirmation_code
+            }
+        )
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone as django_timezone
+from rest_framework.test import APITestCase
+from reviews.models import (Category, Genre, MonthlyScore, Review, ScoreCount,
+                            Title, YaUser)
+
+
+class ReviewStatsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Category.objects.create(name='Фильм', slug='movie')
+        cls.drama = Genre.objects.create(name='Драма', slug='drama')
+        cls.users = [
+            YaUser.objects.create(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+            for number in range(3)
+        ]
+        cls.titles = []
+        for name in ('Крестный отец', 'Брат'):
+            title = Title.objects.create(
+                name=name, year=1972, category=cls.movie
+            )
+            title.genre.set([cls.drama])
+            cls.titles.append(title)
+
+    def setUp(self):
+        cache.clear()
+
+    def review(self, title, user, score):
+        return Review.objects.create(
+            title=title, author=user, text='Отзыв', score=score
+        )
+
+    def stats(self, url):
+        response = self.client.get(f'/api/v1/{url}/stats/')
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertEqual(len(stats['scores']), 10)
+        stats['scores'] = {
+            row['score']: row['reviews'] for row in stats['scores']
+            if row['reviews']
+        }
+        return stats
+
+    def test_follows_reviews(self):
+        title, other = self.titles
+        first = self.review(title, self.users[0], 10)
+        self.review(title, self.users[1], 6)
+        self.review(other, self.users[2], 6)
+        stats = self.stats(f'titles/{title.pk}')
+        self.assertEqual(stats['scores'], {6: 1, 10: 1})
+        self.assertEqual(stats['rating'], 8)
+        month = f'{django_timezone.now():%Y-%m}'
+        self.assertEqual(
+            stats['months'], [{'month': month, 'reviews': 2, 'rating': 8}]
+        )
+        self.assertEqual(self.stats('genres/drama')['scores'], {6: 2, 10: 1})
+
+        first.score = 4
+        first.save()
+        self.assertEqual(
+            self.stats(f'titles/{title.pk}')['scores'], {4: 1, 6: 1}
+        )
+        first.title = other
+        first.save()
+        self.assertEqual(self.stats(f'titles/{other.pk}')['reviews'], 2)
+        first.delete()
+        stats = self.stats('categories/movie')
+        self.assertEqual(stats['scores'], {6: 2})
+        self.assertEqual(stats['months'][0]['reviews'], 2)
+
+        self.assertEqual(
+            self.client.get('/api/v1/titles/999/stats/').status_code, 404
+        )
+
+    def test_rebuild_history(self):
+        title = self.titles[0]
+        for user, score in zip(self.users, (8, 9, 4)):
+            self.review(title, user, score)
+        Review.objects.filter(score=4).update(
+            pub_date=datetime(2020, 1, 31, 23, 0, tzinfo=timezone.utc)
+        )
+        scores = list(
+            ScoreCount.objects.values_list('title', 'score', 'reviews')
+        )
+        ScoreCount.objects.all().delete()
+        MonthlyScore.objects.all().delete()
+        call_command('rebuild_review_stats', stdout=StringIO())
+
+        self.assertCountEqual(
+            ScoreCount.objects.values_list('title', 'score', 'reviews'),
+            scores
+        )
+        months = self.stats(f'titles/{title.pk}')['months']
+        self.assertEqual(months[0], {
+            'month': '2020-01', 'reviews': 1, 'rating': 4
+        })
+        self.assertEqual(months[1]['rating'], 8.5)
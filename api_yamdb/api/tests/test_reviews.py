@@ -0,0 +1,34 @@
+from api.authentication import ClaimsAccessToken
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from reviews.models import Title, YaUser
+
+
+@override_settings(THROTTLE_STORE='api.throttling.CacheBucketStore')
+class ReviewUniquenessTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.title = Title.objects.create(name='Крестный отец', year=1972)
+        cls.url = f'/api/v1/titles/{cls.title.id}/reviews/'
+
+    def setUp(self):
+        cache.clear()
+        token = ClaimsAccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_second_review_is_rejected_by_the_constraint(self):
+        self.assertEqual(self.client.post(
+            self.url, {'text': 'Шедевр', 'score': 10}
+        ).status_code, 201)
+        response = self.client.post(self.url, {'text': 'Ещё раз', 'score': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': [
+            'Вы уже оставили отзыв на это произведение!'
+        ]})
+        title = Title.objects.get(pk=self.title.pk)
+        self.assertEqual((title.score_sum, title.review_count), (10, 1))
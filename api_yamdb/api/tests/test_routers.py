@@ -0,0 +1,64 @@
+from api.routers import ReplicaMiddleware, ReplicaRouter, replica
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from reviews.models import Title
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], CACHE_SHARED=True)
+class ReplicaRoutingTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def read_database(self, method, status=200, token='first', model=Title,
+                      **headers):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(model))
+            return HttpResponse(status=status)
+
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        request = self.factory.generic(method, '/api/v1/titles/', **headers)
+        ReplicaMiddleware(view)(request)
+        self.assertIsNone(replica())
+        return seen[0]
+
+    def test_reads_follow_the_request(self):
+        self.assertEqual(self.read_database('GET'), 'replica1')
+        self.assertIsNone(self.read_database('POST', status=400))
+        self.assertEqual(self.read_database('GET'), 'replica1')
+
+        self.assertIsNone(self.read_database('POST', status=201))
+        self.assertIsNone(self.read_database('GET'))
+        self.assertEqual(self.read_database('GET', token='second'), 'replica1')
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_guests_behind_the_proxy(self):
+        def guest(method, address, status=200):
+            return self.read_database(
+                method, status, token=None, HTTP_X_FORWARDED_FOR=address,
+                REMOTE_ADDR='172.18.0.5'
+            )
+
+        self.assertIsNone(guest('POST', '10.0.0.1', status=201))
+        self.assertIsNone(guest('GET', '10.0.0.1'))
+        self.assertEqual(guest('GET', '10.0.0.2'), 'replica1')
+
+    @override_settings(CACHE_SHARED=False)
+    def test_needs_a_shared_cache(self):
+        self.assertIsNone(self.read_database('GET'))
+
+    def test_outside_requests(self):
+        self.assertIsNone(self.router.db_for_read(Title))
+        self.assertEqual(self.router.db_for_write(Title), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'reviews'))
+        self.assertIsNone(self.router.allow_migrate('default', 'reviews'))
+
+    def test_other_apps_stay_on_primary(self):
+        self.assertIsNone(self.read_database('GET', model=ContentType))
@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+from reviews.models import Category, Genre, Title
+
+
+class SearchTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Category.objects.create(name='Книга', slug='book')
+        Genre.objects.create(name='Драма', slug='drama')
+        Genre.objects.create(name='Мелодрама', slug='melodrama')
+        for name in ('The Godfather', 'The Godfather Part II', 'Titanic'):
+            Title.objects.create(name=name, year=1990, category=category)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_title_name_substring(self):
+        self.assertEqual(
+            self.names('/api/v1/titles/?name=godfather'),
+            ['The Godfather', 'The Godfather Part II']
+        )
+        self.assertEqual(self.names('/api/v1/titles/?name=tan'), ['Titanic'])
+
+    def test_title_name_with_filters(self):
+        Title.objects.filter(name='The Godfather Part II').update(year=1974)
+        self.assertEqual(
+            self.names('/api/v1/titles/?name=godfather&year=1974'),
+            ['The Godfather Part II']
+        )
+
+    def test_title_name_short_term(self):
+        self.assertEqual(self.names('/api/v1/titles/?name=ti'), ['Titanic'])
+
+    def test_catalog_search(self):
+        self.assertEqual(
+            self.names('/api/v1/genres/?search=драма'),
+            ['Драма', 'Мелодрама']
+        )
+        self.assertEqual(
+            self.names('/api/v1/categories/?search=ниг'), ['Книга']
+        )
+
+    def test_search_follows_renames(self):
+        Genre.objects.filter(slug='drama').update(name='Триллер')
+        self.assertEqual(
+            self.names('/api/v1/genres/?search=драма'), ['Мелодрама']
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs pg_trgm')
+    def test_title_name_typo(self):
+        self.assertIn('Titanic', self.names('/api/v1/titles/?name=titanik'))
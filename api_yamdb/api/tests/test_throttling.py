@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+from api.authentication import ClaimsAccessToken
+from api.throttling import FileBucketStore, LocalBucketStore
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from reviews.models import Title, YaUser
+
+
+class BucketStoreTest(SimpleTestCase):
+
+    def test_token_bucket(self):
+        store = LocalBucketStore()
+        waits = [store.take('key', 3, 0.5, 100.0) for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertEqual(waits[3], 2)
+        self.assertEqual(store.take('other', 3, 0.5, 100.0), 0)
+        self.assertEqual(store.take('key', 3, 0.5, 102.0), 0)
+        self.assertGreater(store.take('key', 3, 0.5, 102.0), 0)
+
+    @override_settings(THROTTLE_SLOTS=2)
+    def test_local_store_is_bounded(self):
+        store = LocalBucketStore()
+        for key in ('first', 'second', 'third'):
+            store.take(key, 1, 1, 100.0)
+        self.assertEqual(list(store.buckets), ['second', 'third'])
+
+    def test_file_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets')
+            workers = [FileBucketStore(path, 64), FileBucketStore(path, 64)]
+            waits = [
+                workers[number % 2].take('key', 4, 1, 100.0)
+                for number in range(5)
+            ]
+            self.assertEqual(waits, [0, 0, 0, 0, 1])
+            self.assertEqual(workers[0].take('key', 4, 1, 101.0), 0)
+
+    def test_file_store_reuses_oldest_slot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileBucketStore(os.path.join(directory, 'buckets'), 4)
+            for number in range(50):
+                store.take(f'key{number}', 1, 0.01, 100.0 + number)
+            self.assertGreater(store.take('key49', 1, 0.01, 150.0), 0)
+
+
+@override_settings(THROTTLE_STORE='api.throttling.CacheBucketStore')
+class ThrottledEndpointsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = YaUser.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        cls.title = Title.objects.create(name='Крестный отец', year=1972)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_token_per_username(self):
+        for _ in range(5):
+            response = self.client.post('/api/v1/auth/token/', {
+                'username': 'Reader', 'confirmation_code': 'guess'
+            })
+            self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/v1/auth/token/', {
+            'username': 'reader', 'confirmation_code': 'guess'
+        })
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.client.post('/api/v1/auth/token/', {
+            'username': 'other', 'confirmation_code': 'guess'
+        }).status_code, 404)
+
+    def test_signup_per_address(self):
+        statuses = [
+            self.client.post('/api/v1/auth/signup/', {
+                'username': f'user{number}', 'email': 'bad'
+            }).status_code
+            for number in range(21)
+        ]
+        self.assertEqual(statuses, [400] * 20 + [429])
+
+    def test_review_create(self):
+        token = ClaimsAccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = f'/api/v1/titles/{self.title.id}/reviews/'
+        statuses = [
+            self.client.post(url, {'text': 'Да', 'score': 9}).status_code
+            for _ in range(11)
+        ]
+        self.assertEqual(statuses, [201] + [400] * 9 + [429])
+        self.assertEqual(self.client.get(url).status_code, 200)
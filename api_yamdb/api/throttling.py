@@ -0,0 +1,203 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import SimpleRateThrottle
+
+# Key hash, tokens left, time of the last request.
+SLOT = struct.Struct('=Qdd')
+PROBES = 8
+
+
+def spend(tokens, updated, capacity, rate, now):
+    """Refill a bucket up to now and take one token from it.
+
+    Returns the new level and the seconds to wait, 0 when the request
+    may go through.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Buckets of one process, the least recently used are dropped."""
+
+    def __init__(self):
+        self.size = settings.THROTTLE_SLOTS
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens, wait = spend(tokens, updated, capacity, rate, now)
+            if len(self.buckets) >= self.size:
+                del self.buckets[next(iter(self.buckets))]
+            self.buckets[key] = (tokens, now)
+        return wait
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache, shared by every worker using that cache.
+
+    The read and the write are not atomic, so concurrent requests on the
+    same key may both get the last token.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+
+    def take(self, key, capacity, rate, now):
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens, wait = spend(tokens, updated, capacity, rate, now)
+        # A bucket left alone that long is full again, same as a new one.
+        self.cache.set(
+            key, (tokens, now), timeout=math.ceil(capacity / rate) + 1
+        )
+        return wait
+
+
+class FileBucketStore:
+    """Buckets in a memory mapped file, shared by the workers of a host.
+
+    The file is a fixed table of slots addressed by a hash of the key, a
+    check reads at most PROBES slots and writes one, under an flock. When
+    all the probed slots are taken, the least recently used is reused and
+    its client starts over with a full bucket.
+    """
+
+    def __init__(self, path=None, slots=None):
+        self.path = path or settings.THROTTLE_FILE
+        self.slots = slots or settings.THROTTLE_SLOTS
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        # An flock is shared by the processes forked with its descriptor,
+        # so every worker opens the file itself.
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = SLOT.size * self.slots
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.pid = os.getpid()
+
+    def find(self, digest, capacity, now):
+        oldest = None
+        for probe in range(PROBES):
+            index = (digest + probe) % self.slots
+            stored, tokens, updated = SLOT.unpack_from(
+                self.map, index * SLOT.size
+            )
+            if stored == digest:
+                return index, tokens, updated
+            if not stored:
+                return index, capacity, now
+            if oldest is None or updated < oldest[1]:
+                oldest = (index, updated)
+        return oldest[0], capacity, now
+
+    def take(self, key, capacity, rate, now):
+        # Zero marks an empty slot.
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little'
+        ) or 1
+        with self.lock:
+            if self.pid != os.getpid():
+                self.open()
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                index, tokens, updated = self.find(digest, capacity, now)
+                tokens, wait = spend(tokens, updated, capacity, rate, now)
+                SLOT.pack_into(
+                    self.map, index * SLOT.size, digest, tokens, now
+                )
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return wait
+
+
+@lru_cache(maxsize=None)
+def bucket_store(path):
+    return import_string(path)()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Token bucket version of the DRF rate throttles.
+
+    A rate of N per period is a bucket of N tokens refilled evenly over
+    the period: bursts of up to N requests pass, then one request per
+    period / N. A check costs one bucket read and write in the store set
+    by THROTTLE_STORE, whatever the number of past requests.
+    """
+    methods = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        if self.methods and request.method not in self.methods:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.wait_time = bucket_store(settings.THROTTLE_STORE).take(
+            self.key, self.num_requests, self.num_requests / self.duration,
+            self.timer()
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class AuthUsernameThrottle(TokenBucketThrottle):
+    """Limits the attempts on one username, from whatever addresses."""
+    scope = 'auth_username'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        username = data.get('username') if isinstance(data, dict) else None
+        if not isinstance(username, str) or not username:
+            return None
+        return self.cache_format % {
+            'scope': self.scope, 'ident': username.lower()
+        }
+
+
+class CreateThrottle(TokenBucketThrottle):
+    """Limits the POST requests of a user, or of an address for guests."""
+    methods = ('POST',)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ReviewCreateThrottle(CreateThrottle):
+    scope = 'review_create'
+
+
+class CommentCreateThrottle(CreateThrottle):
+    scope = 'comment_create'
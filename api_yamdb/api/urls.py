@@ -1,8 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import (APIGetToken, APISignup, CategoryViewSet, CommentViewSet,
-                    GenreViewSet, ReviewViewSet, TitleViewSet, YaUserViewSet)
+from .views import (APIDatabasePool, APIExport, APIGetToken, APISignup,
+                    CategoryViewSet, CommentViewSet, GenreViewSet,
+                    LeaderboardViewSet, ReviewViewSet, TitleViewSet,
+                    YaUserViewSet)
 
 app_name = 'api'
 
@@ -32,6 +34,11 @@ router.register(
     TitleViewSet,
     basename='titles'
 )
+router.register(
+    'leaderboards',
+    LeaderboardViewSet,
+    basename='leaderboards'
+)
 router.register(
     'users',
     YaUserViewSet,
@@ -42,4 +49,6 @@ urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/token/', APIGetToken.as_view(), name='get_token'),
     path('v1/auth/signup/', APISignup.as_view(), name='signup'),
+    path('v1/db-pool/', APIDatabasePool.as_view(), name='db_pool'),
+    path('v1/export/<str:kind>/', APIExport.as_view(), name='export'),
 ]
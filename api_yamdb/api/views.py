@@ -1,98 +1,145 @@
-from api.filters import TitleFilter
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from api.filters import IndexedSearchFilter, TitleFilter
+from django.conf import settings
+from django.db import router, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
+from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title, YaUser
+from rest_framework.viewsets import GenericViewSet
+from reviews.models import (Category, Comment, Genre, LeaderboardEntry,
+                            OutgoingEmail, Review, Title, YaUser)
 
-from .mixins import CreateListDestroyViewSet
+from .authentication import ClaimsAccessToken, full_user
+from .db.pool import pool_stats
+from .export import (EXPORTS, CSVRenderer, NDJSONRenderer, csv_lines, encode,
+                     ndjson_lines)
+from .mixins import (BulkCreateMixin, CachedResponseMixin,
+                     CreateListDestroyViewSet, NestedParentMixin,
+                     RatingStatsMixin)
 from .permissions import (AdminOnly, IsAdminUserOrReadOnly,
                           IsAuthorModeratorAdminOrReadOnly)
 from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, GetTokenSerializer,
-                          NotAdminSerializer, ReviewSerializer,
+                          ExportQuerySerializer, GenreSerializer,
+                          GetTokenSerializer, LeaderboardEntrySerializer,
+                          LeaderboardQuerySerializer, NotAdminSerializer,
+                          ReviewImportSerializer, ReviewSerializer,
                           SignUpSerializer, TitleReadSerializer,
                           TitleWriteSerializer, YaUserSerializer)
+from .throttling import (AuthIPThrottle, AuthUsernameThrottle,
+                         CommentCreateThrottle, ReviewCreateThrottle)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(CachedResponseMixin, NestedParentMixin, BulkCreateMixin,
+                    viewsets.ModelViewSet):
+    """
+    Reviews of a title. Admins can post a list of reviews on behalf
+    of their authors, each item naming the author by username.
+    """
     serializer_class = ReviewSerializer
+    cache_models = (Review, YaUser)
+    parent_model = Title
+    parent_lookups = {'title_id': 'id'}
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
     )
+    bulk_create_permission_classes = (AdminOnly,)
+    throttle_classes = (ReviewCreateThrottle,)
+
+    def get_serializer_class(self):
+        if self.action == 'create' and isinstance(self.request.data, list):
+            return ReviewImportSerializer
+        return ReviewSerializer
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author').order_by('pub_date', 'id')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
+        self.check_parent()
         serializer.save(
             author=self.request.user,
-            title=title
+            title_id=self.kwargs.get('title_id')
         )
 
+    def perform_bulk_create(self, serializer):
+        self.check_parent()
+        serializer.save(title_id=self.kwargs.get('title_id'))
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(NestedParentMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    parent_model = Review
+    parent_lookups = {'review_id': 'id', 'title_id': 'title_id'}
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
     )
+    throttle_classes = (CommentCreateThrottle,)
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author').order_by('pub_date', 'id')
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
+        self.check_parent()
         serializer.save(
             author=self.request.user,
-            review=review
+            review_id=self.kwargs.get('review_id')
         )
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(RatingStatsMixin, CachedResponseMixin,
+                      CreateListDestroyViewSet):
     """
     Receive all categoriers. Available without token.
+    Review statistics of a category at categories/<slug>/stats/.
     """
     queryset = Category.objects.all()
+    cache_models = (Category,)
+    stats_lookup = 'title__category'
     serializer_class = CategorySerializer
     permission_classes = (IsAdminUserOrReadOnly,)
-    filter_backends = (SearchFilter, )
+    filter_backends = (IndexedSearchFilter, )
     search_fields = ('name', )
     lookup_field = 'slug'
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(RatingStatsMixin, CachedResponseMixin,
+                   CreateListDestroyViewSet):
     """
     Receive all genries. Available without token.
+    Review statistics of a genre at genres/<slug>/stats/.
     """
     queryset = Genre.objects.all()
+    cache_models = (Genre,)
+    stats_lookup = 'title__genre'
     serializer_class = GenreSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
-    filter_backends = (SearchFilter,)
+    filter_backends = (IndexedSearchFilter,)
     search_fields = ('name', )
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(RatingStatsMixin, CachedResponseMixin, BulkCreateMixin,
+                   viewsets.ModelViewSet):
     """
     Receive all titles. Available without token.
+    Admins can create many titles at once by posting a list.
+    Score distribution and monthly trend at titles/<id>/stats/.
     """
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all()
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('id')
+    # Reviews change the rating of their title.
+    cache_models = (Title, Category, Genre, Title.genre.through, Review)
     permission_classes = (IsAdminUserOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
@@ -103,10 +150,44 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleWriteSerializer
 
 
-class YaUserViewSet(viewsets.ModelViewSet):
+class LeaderboardViewSet(CachedResponseMixin, ListModelMixin,
+                         GenericViewSet):
+    """
+    Top titles by weighted rating: overall, of ?category=<slug> or of
+    ?genre=<slug>, ?limit=N of them. Available without token.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    cache_models = (
+        LeaderboardEntry, Title, Category, Genre, Title.genre.through, Review
+    )
+    filter_backends = ()
+    pagination_class = None
+
+    def get_queryset(self):
+        query = LeaderboardQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        board = query.validated_data
+        limit = min(
+            board.get('limit', settings.LEADERBOARD_SIZE),
+            settings.LEADERBOARD_MAX_SIZE
+        )
+        return LeaderboardEntry.objects.filter(
+            category=board.get('category'), genre=board.get('genre')
+        ).select_related(
+            'title__category'
+        ).prefetch_related('title__genre').order_by('-score', 'title')[:limit]
+
+    def list(self, request, *args, **kwargs):
+        entries = list(self.get_queryset())
+        for rank, entry in enumerate(entries, start=1):
+            entry.rank = rank
+        return Response(self.get_serializer(entries, many=True).data)
+
+
+class YaUserViewSet(BulkCreateMixin, viewsets.ModelViewSet):
     """
     Manage users. Create, delete, modify them all.
-    Available only with a token.
+    Available only with a token. A posted list creates many users.
     """
     queryset = YaUser.objects.all()
     serializer_class = YaUserSerializer
@@ -122,17 +203,18 @@ class YaUserViewSet(viewsets.ModelViewSet):
         url_path='me'
     )
     def get_current_user_info(self, request):
-        serializer = YaUserSerializer(request.user)
+        user = full_user(request.user)
+        serializer = YaUserSerializer(user)
         if request.method == 'PATCH':
-            if request.user.is_admin:
+            if user.is_admin:
                 serializer = YaUserSerializer(
-                    request.user,
+                    user,
                     data=request.data,
                     partial=True
                 )
             else:
                 serializer = NotAdminSerializer(
-                    request.user,
+                    user,
                     data=request.data,
                     partial=True
                 )
@@ -151,6 +233,8 @@ class APIGetToken(APIView):
         "confirmation_code": "string"
     }
     """
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
+
     def post(self, request):
         serializer = GetTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -163,7 +247,7 @@ class APIGetToken(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         if data.get('confirmation_code') == user.confirmation_code:
-            token = RefreshToken.for_user(user).access_token
+            token = ClaimsAccessToken.for_user(user)
             return Response(
                 {'token': str(token)},
                 status=status.HTTP_201_CREATED
@@ -186,29 +270,77 @@ class APISignup(APIView):
     }
     """
     permission_classes = (permissions.AllowAny,)
-
-    @staticmethod
-    def send_email(data):
-        send_mail(
-            data['email_subject'],
-            data['email_body'],
-            None,
-            [data['to_email']],
-            fail_silently=False
-        )
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        email_body = (
-            f'Greetings, young {user.username}.'
-            f'\nTake your conf. code for our API: {user.confirmation_code}'
-        )
-        data = {
-            'email_body': email_body,
-            'to_email': user.email,
-            'email_subject': 'Confirmation code to access out API!'
-        }
-        self.send_email(data)
+        # The send_emails command delivers the code, the request only
+        # queues it together with the new user.
+        with transaction.atomic():
+            user = serializer.save()
+            OutgoingEmail.objects.create(
+                subject='Confirmation code to access out API!',
+                body=(
+                    f'Greetings, young {user.username}.'
+                    f'\nTake your conf. code for our API: '
+                    f'{user.confirmation_code}'
+                ),
+                to_email=user.email
+            )
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class APIExport(APIView):
+    """
+    Stream all titles or reviews as NDJSON, or as CSV with ?format=csv
+    or Accept: text/csv, gzipped for clients that accept it.
+    ?updated_since=<ISO 8601 time> keeps the rows changed since then.
+    Access rights: admin.
+    """
+    permission_classes = (IsAuthenticated, AdminOnly,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def get(self, request, kind):
+        if kind not in EXPORTS:
+            raise Http404
+        model, rows, fields = EXPORTS[kind]
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        # The rows are read after the middleware is done, pick the
+        # database while the request can still use a replica.
+        queryset = model.objects.using(router.db_for_read(model))
+        since = query.validated_data.get('updated_since')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        renderer = request.accepted_renderer
+        rows = rows(queryset, settings.EXPORT_CHUNK_SIZE)
+        if renderer.format == 'csv':
+            lines = csv_lines(rows, fields)
+        else:
+            lines = ndjson_lines(rows)
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = StreamingHttpResponse(
+            encode(lines, compress),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{renderer.format}"'
+        )
+        # Pass the chunks on as they come instead of buffering to disk.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class APIDatabasePool(APIView):
+    """
+    Connection pool counters of the worker process that answers.
+    Only with the api.db.postgresql engine. Access rights: admin.
+    """
+    permission_classes = (IsAuthenticated, AdminOnly,)
+
+    def get(self, request):
+        return Response(pool_stats())
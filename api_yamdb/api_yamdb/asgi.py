@@ -0,0 +1,35 @@
+"""
+ASGI config for YaMDb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler and no async views, so the WSGI application
+runs behind asgiref's adapter: the server reads requests and writes
+responses on its event loop, and only the views take a thread from the
+pool (ASGI_THREADS threads per process). Slow clients then cost a socket
+instead of a whole worker. Serve it with uvicorn workers:
+
+    gunicorn api_yamdb.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+wsgi_application = get_wsgi_application()
+
+
+def closing_application(environ, start_response):
+    # The adapter never closes the response, and Django sends
+    # request_finished, which closes the database connection, on close().
+    response = wsgi_application(environ, start_response)
+    try:
+        yield from response
+    finally:
+        response.close()
+
+
+application = WsgiToAsgi(closing_application)
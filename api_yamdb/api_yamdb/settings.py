@@ -19,19 +19,22 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
-    'api',
+    'api.apps.ApiConfig',
     'reviews',
     'django_extensions',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.routers.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -63,10 +66,46 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='admin'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='admin'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Keep it 0 with the pooled engine, the pool does the reuse.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', default=0)),
+        # Used by the api.db.postgresql engine, per worker process.
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'CHECK_INTERVAL': float(
+                os.getenv('DB_POOL_CHECK_INTERVAL', default=0)
+            ),
+            'MAX_LIFETIME': float(
+                os.getenv('DB_POOL_MAX_LIFETIME', default=3600)
+            ),
+        },
     }
 }
 
+# Comma separated replica hosts (host or host:port) of the default
+# database, or database files with SQLite.
+DATABASE_REPLICAS = []
+
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(',')), 1
+):
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        location = {'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        location = {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'], **location, 'TEST': {'MIRROR': 'default'}
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after a write, and the longest
+# a response read from a replica stays in the response cache.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -99,16 +138,92 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
-    'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.HybridPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('THROTTLE_AUTH_IP', default='20/min'),
+        'auth_username': os.getenv('THROTTLE_AUTH_USERNAME', default='5/min'),
+        'review_create': os.getenv('THROTTLE_REVIEW_CREATE', default='10/min'),
+        'comment_create': os.getenv(
+            'THROTTLE_COMMENT_CREATE', default='30/min'
+        ),
+    },
+    # Proxies in front of the app, nginx in the docker setup.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=0)),
+}
+
+# The workers of a host share the buckets through a memory mapped file.
+# With the default per-process cache each worker would count alone and let
+# through a multiple of the rate.
+THROTTLE_STORE = os.getenv(
+    'THROTTLE_STORE', default='api.throttling.FileBucketStore'
+)
+
+THROTTLE_CACHE = 'default'
+
+THROTTLE_FILE = os.getenv('THROTTLE_FILE', default='/tmp/api_yamdb-throttle')
+
+THROTTLE_SLOTS = int(os.getenv('THROTTLE_SLOTS', default=65536))
+
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
 }
 
+# Whether every process serving requests reads the same cache. The
+# response cache is off without it; a per-process cache is only shared
+# when a single process serves everything (CACHE_SHARED=1).
+CACHE_SHARED = bool(int(os.getenv(
+    'CACHE_SHARED',
+    default=CACHE_BACKEND not in (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+)))
+
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default=300)
+)
+
+RESPONSE_CACHE_MAX_AGE = int(
+    os.getenv('RESPONSE_CACHE_MAX_AGE', default=0)
+)
+
+RESPONSE_CACHE_STALE_WHILE_REVALIDATE = int(
+    os.getenv('RESPONSE_CACHE_STALE_WHILE_REVALIDATE', default=30)
+)
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default=30)
+)
+
+PAGINATION_COUNT_ESTIMATE_FROM = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_FROM', default=100000)
+)
+
+BULK_CREATE_MAX_ITEMS = int(
+    os.getenv('BULK_CREATE_MAX_ITEMS', default=1000)
+)
+
+AUTH_TOKEN_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_CACHE_SIZE', default=10000)
+)
+
+AUTH_TOKEN_CACHE_TTL = int(
+    os.getenv('AUTH_TOKEN_CACHE_TTL', default=60)
+)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -121,3 +236,39 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_FROM_EMAIL = 'vebmaster@yamdb.ru'
 
 AUTH_USER_MODEL = 'reviews.YaUser'
+
+# Directory shared by the workers for their metrics, empty to only show
+# the worker answering /metrics.
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=1))
+
+# Bearer token of the Prometheus scraper, /metrics is off without it.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+# Reports of the requests profiled with X-Profile: store.
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles')
+)
+
+# Rows of the function and allocation tables of a profile report.
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', default=30))
+
+# Weighted rating of the leaderboards: the average score of a title
+# counts LEADERBOARD_PRIOR_REVIEWS reviews of LEADERBOARD_PRIOR_SCORE.
+LEADERBOARD_PRIOR_SCORE = float(
+    os.getenv('LEADERBOARD_PRIOR_SCORE', default=5.5)
+)
+
+LEADERBOARD_PRIOR_REVIEWS = int(
+    os.getenv('LEADERBOARD_PRIOR_REVIEWS', default=10)
+)
+
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', default=10))
+
+LEADERBOARD_MAX_SIZE = int(os.getenv('LEADERBOARD_MAX_SIZE', default=100))
+
+# Rows read per query and bytes per chunk of the streamed exports.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', default=2000))
+
+EXPORT_BUFFER_SIZE = int(os.getenv('EXPORT_BUFFER_SIZE', default=65536))
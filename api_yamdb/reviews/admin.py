@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, GenreTitle, Review, Title, YaUser
+from .models import (Category, Comment, Genre, GenreTitle, OutgoingEmail,
+                     Review, Title, YaUser)
 
 
 @admin.register(Category)
@@ -84,3 +85,17 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(GenreTitle)
 class GenreTitleAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'to_email',
+        'subject',
+        'created_at',
+        'attempts',
+        'sent_at',
+    )
+    search_fields = ('to_email',)
+    list_filter = ('sent_at',)
+    empty_value_display = '-nothing-'
@@ -0,0 +1,255 @@
+import csv
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from reviews.management.commands.load_data import (Progress, action,
+                                                   dependency_order,
+                                                   finish_loading, load_rows)
+from reviews.models import ADMIN, MODERATOR, USER
+
+WORDS = (
+    'тихий', 'последний', 'красный', 'долгий', 'ночной', 'северный',
+    'город', 'берег', 'сад', 'ветер', 'путь', 'дом', 'огонь', 'остров',
+    'star', 'silent', 'broken', 'river', 'king', 'night', 'garden', 'road',
+    'summer', 'shadow', 'glass', 'winter', 'song', 'empire', 'dream', 'code',
+)
+CATEGORIES = (
+    ('Фильм', 'movie'), ('Книга', 'book'), ('Музыка', 'music'),
+    ('Сериал', 'series'), ('Игра', 'game'), ('Комикс', 'comics'),
+)
+FIRST_DATE = datetime(2010, 1, 1, tzinfo=timezone.utc)
+# Fixed, not today: a seed gives the same rows whenever it runs.
+LAST_DATE = datetime(2022, 8, 1, tzinfo=timezone.utc)
+DATE_SPAN = int((LAST_DATE - FIRST_DATE).total_seconds())
+HEADERS = {
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'users.csv': (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    ),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+
+def zipf_weights(count, skew):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def allocate(total, weights, cap):
+    """Split total into integer shares proportional to weights.
+
+    No share exceeds cap; what does not fit goes to the next shares.
+    """
+    weight_sum = sum(weights)
+    shares = []
+    carry = 0.0
+    for weight in weights:
+        wanted = total * weight / weight_sum + carry
+        share = min(int(wanted), cap)
+        carry = wanted - share
+        shares.append(share)
+    return shares
+
+
+def format_date(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + (
+        f'{moment.microsecond // 1000:03d}Z'
+    )
+
+
+def review_date(review_id):
+    # Derived from the id, so comments can follow their review without
+    # keeping millions of dates in memory.
+    offset = (review_id * 2654435761) % DATE_SPAN
+    return FIRST_DATE + timedelta(seconds=offset)
+
+
+class Dataset:
+    """Deterministic dataset with the layout of the static/data files.
+
+    Title popularity follows a Zipf law, so a few titles collect most of
+    the reviews and comments, as in production.
+    """
+
+    def __init__(self, seed, users, titles, reviews, comments, genres, skew):
+        self.seed = seed
+        self.users = users
+        self.titles = titles
+        self.reviews = reviews
+        self.comments = comments
+        self.genres = genres
+        self.skew = skew
+
+    def random(self, table):
+        # Every table has its own stream, so generating one file does not
+        # depend on having generated the others.
+        return random.Random(f'{self.seed}:{table}')
+
+    def text(self, rnd, words):
+        return ' '.join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+    def rows(self, filename):
+        return {
+            'category.csv': self.category_rows,
+            'genre.csv': self.genre_rows,
+            'titles.csv': self.title_rows,
+            'genre_title.csv': self.genre_title_rows,
+            'users.csv': self.user_rows,
+            'review.csv': self.review_rows,
+            'comments.csv': self.comment_rows,
+        }[filename]()
+
+    def review_shares(self):
+        return allocate(
+            self.reviews, zipf_weights(self.titles, self.skew), self.users
+        )
+
+    def category_rows(self):
+        for number, (name, slug) in enumerate(CATEGORIES, 1):
+            yield (number, name, slug)
+
+    def genre_rows(self):
+        for number in range(1, self.genres + 1):
+            yield (number, f'Жанр {number}', f'genre-{number}')
+
+    def title_rows(self):
+        rnd = self.random('titles')
+        category_weights = list(accumulate(
+            zipf_weights(len(CATEGORIES), 1)
+        ))
+        for number in range(1, self.titles + 1):
+            year = LAST_DATE.year - int(rnd.expovariate(1 / 15)) % 120
+            category = rnd.choices(
+                range(1, len(CATEGORIES) + 1), cum_weights=category_weights
+            )[0]
+            yield (number, self.text(rnd, rnd.randint(1, 4)), year, category)
+
+    def genre_title_rows(self):
+        rnd = self.random('genre_title')
+        genre_weights = list(accumulate(zipf_weights(self.genres, 0.8)))
+        number = 0
+        for title_id in range(1, self.titles + 1):
+            genres = set(rnd.choices(
+                range(1, self.genres + 1),
+                cum_weights=genre_weights,
+                k=rnd.choice((1, 1, 2, 2, 2, 3))
+            ))
+            for genre_id in sorted(genres):
+                number += 1
+                yield (number, title_id, genre_id)
+
+    def user_rows(self):
+        rnd = self.random('users')
+        for number in range(1, self.users + 1):
+            role = rnd.choices((USER, MODERATOR, ADMIN), (980, 19, 1))[0]
+            yield (
+                number, f'user{number}', f'user{number}@yamdb.fake',
+                role, '', '', ''
+            )
+
+    def review_rows(self):
+        rnd = self.random('review')
+        number = 0
+        for title_id, share in enumerate(self.review_shares(), 1):
+            quality = rnd.gauss(7, 1.5)
+            for author in rnd.sample(range(1, self.users + 1), share):
+                number += 1
+                score = min(10, max(1, round(rnd.gauss(quality, 1.5))))
+                yield (
+                    number, title_id, self.text(rnd, rnd.randint(3, 30)),
+                    author, score, format_date(review_date(number))
+                )
+
+    def comment_rows(self):
+        rnd = self.random('comments')
+        reviews = sum(self.review_shares())
+        if not reviews:
+            return
+        for number in range(1, self.comments + 1):
+            # Reviews of popular titles come first and get most comments.
+            review_id = 1 + int(reviews * rnd.random() ** (1 + self.skew))
+            posted = review_date(review_id) + timedelta(
+                seconds=int(rnd.expovariate(1 / 86400))
+            )
+            yield (
+                number, review_id, self.text(rnd, rnd.randint(2, 20)),
+                rnd.randint(1, self.users), format_date(posted)
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic dataset of the given size, either as '
+        'CSV files in the load_data layout or inserted directly.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument(
+            '--output',
+            help='Directory to write the CSV files to.'
+        )
+        target.add_argument(
+            '--insert',
+            action='store_true',
+            help='Insert the rows into the database instead.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--titles', type=int, default=20000)
+        parser.add_argument('--reviews', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--genres', type=int, default=40)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of title popularity.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for count in ('users', 'titles', 'genres', 'batch_size'):
+            if options[count] < 1:
+                raise CommandError(
+                    f'--{count.replace("_", "-")} must be at least 1.'
+                )
+        for count in ('reviews', 'comments'):
+            if options[count] < 0:
+                raise CommandError(f'--{count} cannot be negative.')
+        dataset = Dataset(
+            options['seed'], options['users'], options['titles'],
+            options['reviews'], options['comments'], options['genres'],
+            options['skew']
+        )
+        filenames = dependency_order(list(action))
+        if options['insert']:
+            for filename in filenames:
+                load_rows(
+                    filename,
+                    iter(dataset.rows(filename)),
+                    batch_size=options['batch_size'],
+                    progress=Progress(self.stdout, filename)
+                )
+            finish_loading(filenames)
+            return
+        os.makedirs(options['output'], exist_ok=True)
+        for filename in filenames:
+            path = os.path.join(options['output'], filename)
+            progress = Progress(self.stdout, filename)
+            written = 0
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(HEADERS[filename])
+                for row in dataset.rows(filename):
+                    writer.writerow(row)
+                    written += 1
+                    if not written % options['batch_size']:
+                        progress(written)
+            progress(written, done=True)
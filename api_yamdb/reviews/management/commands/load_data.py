@@ -1,47 +1,61 @@
 import csv
+import gzip
 import os
+import time
+from itertools import islice
 
+from api.cache import bump_versions
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
-                            Title, YaUser)
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from reviews.models import (Category, Comment, Genre, LeaderboardEntry,
+                            MonthlyScore, Review, ScoreCount, Title, YaUser,
+                            confirmation_codes)
 
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static/data/')
+PROGRESS_INTERVAL = 1
 
-def category_create(row):
-    Category.objects.get_or_create(
+
+def category_build(row):
+    return dict(
         id=row[0],
         name=row[1],
         slug=row[2],
     )
 
 
-def genre_create(row):
-    Genre.objects.get_or_create(
+def genre_build(row):
+    return dict(
         id=row[0],
         name=row[1],
         slug=row[2],
     )
 
 
-def titles_create(row):
-    Title.objects.get_or_create(
+def titles_build(row):
+    title = dict(
         id=row[0],
         name=row[1],
         year=row[2],
-        category_id=row[3],
+        category_id=row[3] or None,
     )
+    # Written by export_data, the static files have no descriptions.
+    if len(row) > 4:
+        title['description'] = row[4] or None
+    return title
 
 
-def genre_title_create(row):
-    GenreTitle.objects.get_or_create(
+def genre_title_build(row):
+    return dict(
         id=row[0],
         genre_id=row[2],
         title_id=row[1],
     )
 
 
-def users_create(row):
-    YaUser.objects.get_or_create(
+def users_build(row):
+    user = dict(
         id=row[0],
         username=row[1],
         email=row[2],
@@ -50,10 +64,20 @@ def users_create(row):
         first_name=row[5],
         last_name=row[6],
     )
+    # Written by export_data, the static files have no accounts.
+    if len(row) > 7:
+        user.update(
+            password=row[7],
+            is_staff=row[8],
+            is_superuser=row[9],
+            is_active=row[10],
+            date_joined=row[11],
+        )
+    return user
 
 
-def reviews_create(row):
-    Review.objects.get_or_create(
+def reviews_build(row):
+    return dict(
         id=row[0],
         title_id=row[1],
         text=row[2],
@@ -63,8 +87,8 @@ def reviews_create(row):
     )
 
 
-def comments_create(row):
-    Comment.objects.get_or_create(
+def comments_build(row):
+    return dict(
         id=row[0],
         review_id=row[1],
         text=row[2],
@@ -74,30 +98,195 @@ def comments_create(row):
 
 
 action = {
-    'category.csv': category_create,
-    'genre.csv': genre_create,
-    'titles.csv': titles_create,
-    'genre_title.csv': genre_title_create,
-    'users.csv': users_create,
-    'review.csv': reviews_create,
-    'comments.csv': comments_create,
+    'category.csv': (Category, category_build),
+    'genre.csv': (Genre, genre_build),
+    'titles.csv': (Title, titles_build),
+    'genre_title.csv': (Title.genre.through, genre_title_build),
+    'users.csv': (YaUser, users_build),
+    'review.csv': (Review, reviews_build),
+    'comments.csv': (Comment, comments_build),
 }
 
 
+def dependency_order(filenames):
+    """Sort the files so that every model is loaded after its foreign keys."""
+    models = {action[filename][0] for filename in filenames}
+
+    def depth(model):
+        return 1 + max((
+            depth(field.related_model)
+            for field in model._meta.concrete_fields
+            if field.many_to_one
+            and field.related_model in models
+            and field.related_model is not model
+        ), default=0)
+
+    return sorted(
+        filenames, key=lambda filename: depth(action[filename][0])
+    )
+
+
+def open_data(path):
+    """Open the CSV file, or its gzipped copy when only that exists."""
+    if not os.path.exists(path) and os.path.exists(f'{path}.gz'):
+        return gzip.open(f'{path}.gz', 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def insert_batch(model, rows, upsert):
+    columns = [name for name in rows[0] if name != 'id']
+    if model is YaUser:
+        # New users get their codes in the insert, existing ones keep theirs.
+        rows = [
+            dict(row, confirmation_code=code)
+            for row, code in zip(rows, confirmation_codes(len(rows)))
+        ]
+    objects = [model(**row) for row in rows]
+    for obj in objects:
+        obj.pk = model._meta.pk.to_python(obj.pk)
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    created = [obj for obj in objects if obj.pk not in existing]
+    # bulk_create() stamps the auto_now_add columns with the current time,
+    # the values read from the file are put back right after.
+    stamped = [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False) and field.attname in columns
+    ]
+    stamps = [[getattr(obj, name) for name in stamped] for obj in created]
+    model.objects.bulk_create(created, ignore_conflicts=not upsert)
+    if stamped and created:
+        for obj, values in zip(created, stamps):
+            for name, value in zip(stamped, values):
+                setattr(obj, name, value)
+        model.objects.bulk_update(created, stamped)
+    if not upsert:
+        return
+    # Only the columns present in the file are overwritten, and the
+    # auto_now ones that bulk_update() does not set by itself.
+    updated = [obj for obj in objects if obj.pk in existing]
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False):
+            columns.append(field.name)
+            for obj in updated:
+                field.pre_save(obj, add=False)
+    model.objects.bulk_update(updated, columns)
+
+
 class Command(BaseCommand):
+    help = (
+        'Load static/data CSV files in batches. Without file names every '
+        'known file is loaded, always in foreign key order.'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             'filename',
-            nargs='+',
+            nargs='*',
             type=str
         )
+        parser.add_argument(
+            '--path',
+            default=DATA_DIR,
+            help='Directory with the CSV files, plain or gzipped (.csv.gz).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows inserted per query and per transaction.'
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Update rows whose id exists instead of skipping them.'
+        )
+        parser.add_argument(
+            '--resume-from',
+            type=int,
+            default=0,
+            metavar='ROW',
+            help='Skip this many data rows of the file.'
+        )
 
     def handle(self, *args, **options):
-        for filename in options['filename']:
-            path = os.path.join(settings.BASE_DIR, "static/data/") + filename
-            with open(path, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    action[filename](row)
+        unknown = set(options['filename']) - set(action)
+        if unknown:
+            raise CommandError(f'Unknown files: {", ".join(unknown)}')
+        if options['resume_from'] and len(options['filename']) != 1:
+            raise CommandError('--resume-from needs a single file name.')
+        filenames = dependency_order(options['filename'] or list(action))
+        skip = options['resume_from']
+        for filename in filenames:
+            self.load(filename, skip, options)
+            skip = 0
+        finish_loading(filenames)
+
+    def load(self, filename, skip, options):
+        with open_data(os.path.join(options['path'], filename)) as file:
+            reader = csv.reader(file)
+            next(reader)
+            load_rows(
+                filename,
+                islice(reader, skip, None),
+                batch_size=options['batch_size'],
+                upsert=options['upsert'],
+                progress=Progress(self.stdout, filename, skip)
+            )
+
+
+class Progress:
+    """Prints the rows loaded so far and the rate, once per interval."""
+
+    def __init__(self, stdout, filename, skip=0):
+        self.stdout = stdout
+        self.filename = filename
+        self.skip = skip
+        self.started = self.reported = time.monotonic()
+
+    def __call__(self, loaded, done=False):
+        now = time.monotonic()
+        if not done and now - self.reported < PROGRESS_INTERVAL:
+            return
+        self.reported = now
+        elapsed = now - self.started
+        rate = loaded / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{self.filename}: {self.skip + loaded} rows, '
+            f'{rate:.0f} rows/sec'
+        )
+
+
+def load_rows(filename, rows, batch_size=1000, upsert=False, progress=None):
+    """Insert rows laid out as in the CSV file, one transaction per batch."""
+    model, build = action[filename]
+    loaded = 0
+    while True:
+        batch = [build(row) for row in islice(rows, batch_size)]
+        if not batch:
+            break
+        with transaction.atomic():
+            insert_batch(model, batch, upsert)
+        loaded += len(batch)
+        if progress:
+            progress(loaded)
+    if progress:
+        progress(loaded, done=True)
+    return loaded
+
+
+def finish_loading(filenames):
+    """Reset the id sequences and refresh the data derived from the rows."""
+    models = [action[filename][0] for filename in filenames]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    if Review in models:
+        Title.objects.recount_ratings()
+        ScoreCount.objects.rebuild()
+        MonthlyScore.objects.rebuild()
+    if {Review, Title, Title.genre.through} & set(models):
+        LeaderboardEntry.objects.refresh()
+    # Bulk inserts send no signals, drop the cached responses here.
+    bump_versions(Title, LeaderboardEntry, ScoreCount, MonthlyScore, *models)
@@ -0,0 +1,25 @@
+from api.cache import bump_versions
+from django.core.management.base import BaseCommand
+from reviews.models import MonthlyScore, ScoreCount
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the score distribution and the monthly trend of titles '
+        'from their reviews.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'title_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild these titles.'
+        )
+
+    def handle(self, *args, **options):
+        title_ids = options['title_ids'] or None
+        scores = ScoreCount.objects.rebuild(title_ids)
+        months = MonthlyScore.objects.rebuild(title_ids)
+        bump_versions(ScoreCount, MonthlyScore)
+        self.stdout.write(f'Score counts: {scores}, monthly scores: {months}')
@@ -0,0 +1,25 @@
+from api.cache import bump_versions
+from django.core.management.base import BaseCommand
+from reviews.models import LeaderboardEntry, Title
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored review totals of titles from their reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'title_ids',
+            nargs='*',
+            type=int,
+            help='Only recount these titles.'
+        )
+
+    def handle(self, *args, **options):
+        titles = Title.objects.all()
+        if options['title_ids']:
+            titles = titles.filter(pk__in=options['title_ids'])
+        fixed = titles.recount_ratings()
+        if fixed:
+            LeaderboardEntry.objects.refresh(options['title_ids'] or None)
+            bump_versions(Title, LeaderboardEntry)
+        self.stdout.write(f'Titles recounted: {fixed}')
@@ -0,0 +1,23 @@
+from api.cache import bump_versions
+from django.core.management.base import BaseCommand
+from reviews.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the leaderboard entries from the review totals, after '
+        'a change of the LEADERBOARD_PRIOR settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'title_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild the entries of these titles.'
+        )
+
+    def handle(self, *args, **options):
+        rated = LeaderboardEntry.objects.refresh(options['title_ids'] or None)
+        bump_versions(LeaderboardEntry)
+        self.stdout.write(f'Titles on the leaderboards: {rated}')
@@ -0,0 +1,160 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from reviews.models import OutgoingEmail
+
+# Longest wait between polls with --loop while sending keeps failing.
+MAX_RETRY_INTERVAL = 300
+
+
+def pending(max_attempts):
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        send_after__lte=timezone.now(),
+        attempts__lt=max_attempts
+    ).order_by('send_after', 'id')
+
+
+class Command(BaseCommand):
+    help = (
+        'Send the queued emails in batches, one mail connection each. '
+        'Failed emails are retried with exponential backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Give up on an email after this many failures.'
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=30,
+            help='Seconds before the first retry, doubled for each next one.'
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=300,
+            help='Seconds a batch stays claimed by this worker while it '
+                 'is sent.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help=(
+                'Keep polling the outbox instead of exiting once it is '
+                'empty, and after errors of the mail server.'
+            )
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between polls of an empty outbox with --loop.'
+        )
+
+    def handle(self, *args, **options):
+        sent = failed = errors = 0
+        while True:
+            try:
+                batch_sent, batch_failed = self.send_batch(options)
+            except Exception as error:
+                if not options['loop']:
+                    raise
+                # The batch is back in the queue, try again later.
+                errors += 1
+                wait = min(
+                    options['interval'] * 2 ** errors, MAX_RETRY_INTERVAL
+                )
+                self.stderr.write(
+                    f'Sending failed, retrying in {wait:.0f} s: {error!r}'
+                )
+                time.sleep(wait)
+                continue
+            errors = 0
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent or batch_failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Emails sent: {sent}, failed: {failed}')
+
+    def claim(self, options):
+        """Take a batch off the queue for the next --lease seconds.
+
+        The lock only lasts this short transaction: the claimed rows wait
+        until send_after for their results, and go back to the queue by
+        themselves if this worker dies while sending.
+        """
+        with transaction.atomic():
+            # Rows locked by another worker are left to it.
+            batch = list(pending(options['max_attempts']).select_for_update(
+                skip_locked=True
+            )[:options['batch_size']])
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in batch]
+            ).update(
+                send_after=timezone.now() + timedelta(
+                    seconds=options['lease']
+                )
+            )
+        return batch
+
+    def send_batch(self, options):
+        batch = self.claim(options)
+        if not batch:
+            return 0, 0
+        # Opened per batch, an idle connection would time out between polls.
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception:
+            # The server is unreachable, back to the queue as they were.
+            OutgoingEmail.objects.bulk_update(batch, ('send_after',))
+            raise
+        sent = []
+        failed = []
+        unsent = []
+        now = timezone.now()
+        for number, email in enumerate(batch):
+            try:
+                connection.send_messages([EmailMessage(
+                    email.subject, email.body, None, [email.to_email],
+                    connection=connection
+                )])
+            except Exception as error:
+                email.attempts += 1
+                email.last_error = repr(error)
+                email.send_after = now + timedelta(
+                    seconds=options['backoff'] * 2 ** (email.attempts - 1)
+                )
+                failed.append(email)
+                # The connection may be broken, start a fresh one.
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    unsent = batch[number + 1:]
+                    break
+            else:
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                sent.append(email)
+        connection.close()
+        OutgoingEmail.objects.bulk_update(sent, ('attempts', 'sent_at'))
+        OutgoingEmail.objects.bulk_update(
+            failed, ('attempts', 'last_error', 'send_after')
+        )
+        # Claimed but never tried, due again as they were.
+        OutgoingEmail.objects.bulk_update(unsent, ('send_after',))
+        return len(sent), len(failed)
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:15
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = Title.objects.using(schema_editor.connection.alias).annotate(
+        actual_sum=Sum('reviews__score'),
+        actual_count=Count('reviews')
+    ).filter(actual_count__gt=0)
+    for title in titles.iterator():
+        title.score_sum = title.actual_sum
+        title.review_count = title.actual_count
+        title.save(update_fields=('score_sum', 'review_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of reviews'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sum of review scores'),
+        ),
+        migrations.RunPython(
+            backfill_rating_totals, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+SEARCH_TABLES = ('reviews_title', 'reviews_category', 'reviews_genre')
+
+
+def create_search_indexes(apps, schema_editor):
+    # SQLite gets its FTS5 tables from api.search after every migrate.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in SEARCH_TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX "{table}_name_trgm" ON "{table}" '
+            f'USING gin (UPPER("name") gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in SEARCH_TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_name_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_title_rating_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
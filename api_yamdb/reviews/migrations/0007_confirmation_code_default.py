@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:44
+
+from django.db import migrations, models
+from django.db.models import Q
+
+import reviews.models
+
+BATCH_SIZE = 1000
+
+
+def backfill_confirmation_codes(apps, schema_editor):
+    # Users inserted with bulk_create() never got past the placeholder.
+    YaUser = apps.get_model('reviews', 'YaUser')
+    users = YaUser.objects.using(schema_editor.connection.alias).filter(
+        Q(confirmation_code='XXXX') | Q(confirmation_code__isnull=True)
+    ).order_by('pk').only('pk')
+    while True:
+        batch = list(users[:BATCH_SIZE])
+        if not batch:
+            break
+        codes = reviews.models.confirmation_codes(len(batch))
+        for user, code in zip(batch, codes):
+            user.confirmation_code = code
+        YaUser.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ('confirmation_code',)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='yauser',
+            name='confirmation_code',
+            field=models.CharField(default=reviews.models.generate_confirmation_code, max_length=255, null=True, verbose_name='Confirmation code'),
+        ),
+        migrations.RunPython(
+            backfill_confirmation_codes, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, FloatField, Value
+from django.db.models.functions import Cast
+
+BATCH_SIZE = 1000
+
+
+def weighted_rating():
+    # reviews.models.weighted_rating() as of this migration.
+    reviews = float(getattr(settings, 'LEADERBOARD_PRIOR_REVIEWS', 10))
+    prior = getattr(settings, 'LEADERBOARD_PRIOR_SCORE', 5.5)
+    return ExpressionWrapper(
+        (
+            Cast('score_sum', FloatField())
+            + Value(reviews * prior, FloatField())
+        ) / (
+            Cast('review_count', FloatField()) + Value(reviews, FloatField())
+        ),
+        output_field=FloatField()
+    )
+
+
+def fill_leaderboards(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Title = apps.get_model('reviews', 'Title')
+    LeaderboardEntry = apps.get_model('reviews', 'LeaderboardEntry')
+    genres = {}
+    links = Title.genre.through.objects.using(alias).filter(
+        title__review_count__gt=0
+    ).values_list('title_id', 'genre_id')
+    for title_id, genre_id in links.iterator():
+        genres.setdefault(title_id, []).append(genre_id)
+    rated = Title.objects.using(alias).filter(review_count__gt=0).annotate(
+        weighted=weighted_rating()
+    ).values_list('id', 'category_id', 'weighted')
+    entries = []
+    for title_id, category_id, score in rated.iterator():
+        boards = [(None, None), *((None, genre) for genre in genres.get(
+            title_id, ()
+        ))]
+        if category_id is not None:
+            boards.append((category_id, None))
+        entries.extend(
+            LeaderboardEntry(
+                title_id=title_id, category_id=category, genre_id=genre,
+                score=score
+            )
+            for category, genre in boards
+        )
+        # Not batch_size=, Django 2.2 would not cut it down to the
+        # number of rows SQLite takes in one INSERT.
+        if len(entries) >= BATCH_SIZE:
+            LeaderboardEntry.objects.using(alias).bulk_create(entries)
+            entries = []
+    LeaderboardEntry.objects.using(alias).bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_confirmation_code_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Weighted rating')),
+                ('category', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Category')),
+                ('genre', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Genre')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Title')),
+            ],
+            options={
+                'verbose_name': 'Leaderboard entry',
+                'verbose_name_plural': 'Leaderboard entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['category', 'genre', '-score', 'title'], name='leaderboard_rank_idx'),
+        ),
+        migrations.RunPython(fill_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+BATCH_SIZE = 1000
+
+
+def insert_rows(model, alias, rows):
+    # Not batch_size=, Django 2.2 would not cut it down to the number of
+    # rows SQLite takes in one INSERT.
+    batch = []
+    for values in rows.iterator():
+        batch.append(model(**values))
+        if len(batch) >= BATCH_SIZE:
+            model.objects.using(alias).bulk_create(batch)
+            batch = []
+    model.objects.using(alias).bulk_create(batch)
+
+
+def fill_review_rollups(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Review = apps.get_model('reviews', 'Review')
+    reviews = Review.objects.using(alias).order_by()
+    insert_rows(
+        apps.get_model('reviews', 'ScoreCount'), alias,
+        reviews.values('title_id', 'score').annotate(reviews=Count('id'))
+    )
+    insert_rows(
+        apps.get_model('reviews', 'MonthlyScore'), alias,
+        reviews.annotate(
+            month=TruncMonth('pub_date', output_field=models.DateField())
+        ).values('title_id', 'month').annotate(
+            score_sum=Sum('score'), review_count=Count('id')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_leaderboard_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField()),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='reviews.Title')),
+            ],
+            options={
+                'verbose_name': 'Score count',
+                'verbose_name_plural': 'Score counts',
+                'unique_together': {('title', 'score')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('score_sum', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_scores', to='reviews.Title')),
+            ],
+            options={
+                'verbose_name': 'Monthly score',
+                'verbose_name_plural': 'Monthly scores',
+                'unique_together': {('title', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_review_rollups, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,17 @@
+import base64
+import secrets
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.contrib.auth.tokens import default_token_generator
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import connections, models, router, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField,
+                              OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Cast, TruncMonth
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete, pre_save)
 from django.dispatch import receiver
+from django.utils import timezone
 
 from .validators import validate_username, validate_year
 
@@ -17,6 +25,27 @@ ROLE_CHOICES = [
     (MODERATOR, MODERATOR)
 ]
 
+CONFIRMATION_CODE_BYTES = 24
+
+MIN_SCORE = 1
+MAX_SCORE = 10
+
+
+def generate_confirmation_code():
+    return secrets.token_urlsafe(CONFIRMATION_CODE_BYTES)
+
+
+def confirmation_codes(count):
+    """Codes for a batch of users, from one read of random bytes."""
+    size = CONFIRMATION_CODE_BYTES * 4 // 3
+    encoded = base64.urlsafe_b64encode(
+        secrets.token_bytes(CONFIRMATION_CODE_BYTES * count)
+    ).decode()
+    return [
+        encoded[start:start + size]
+        for start in range(0, len(encoded), size)
+    ]
+
 
 class YaUser(AbstractUser):
     """Customized user model."""
@@ -64,7 +93,7 @@ class YaUser(AbstractUser):
         verbose_name='Confirmation code',
         blank=False,
         null=True,
-        default='XXXX',
+        default=generate_confirmation_code,
     )
 
     class Meta:
@@ -88,16 +117,6 @@ class YaUser(AbstractUser):
         return self.username
 
 
-@receiver(post_save, sender=YaUser)
-def post_save(sender, instance, created, **kwargs):
-    if created:
-        confirmation_code = default_token_generator.make_token(
-            instance
-        )
-        instance.confirmation_code = confirmation_code
-        instance.save()
-
-
 class Category(models.Model):
     """Category model."""
     name = models.CharField(
@@ -140,6 +159,42 @@ class Genre(models.Model):
         return f'{self.name} {self.name}'
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def update_rating(self, score_delta, count_delta):
+        """Shift the stored review totals by the given deltas atomically."""
+        return self.update(
+            score_sum=F('score_sum') + score_delta,
+            review_count=F('review_count') + count_delta,
+            updated_at=timezone.now()
+        )
+
+    def recount_ratings(self):
+        """Rebuild the stored review totals from the reviews table.
+
+        Returns the number of titles whose totals were out of date.
+        """
+        stale = []
+        titles = self.annotate(
+            actual_sum=Sum('reviews__score'),
+            actual_count=Count('reviews')
+        ).only('id', 'score_sum', 'review_count')
+        now = timezone.now()
+        for title in titles.iterator():
+            actual_sum = title.actual_sum or 0
+            if (title.score_sum, title.review_count) != (
+                    actual_sum, title.actual_count):
+                title.score_sum = actual_sum
+                title.review_count = title.actual_count
+                title.updated_at = now
+                stale.append(title)
+        Title.objects.bulk_update(
+            stale, ('score_sum', 'review_count', 'updated_at'),
+            batch_size=1000
+        )
+        return len(stale)
+
+
 class Title(models.Model):
     """Masterpiece model."""
     name = models.CharField(
@@ -149,7 +204,8 @@ class Title(models.Model):
     )
     year = models.PositiveSmallIntegerField(
         'Year',
-        validators=(validate_year, )
+        validators=(validate_year, ),
+        db_index=True
     )
     category = models.ForeignKey(
         Category,
@@ -170,6 +226,24 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Genre'
     )
+    score_sum = models.PositiveIntegerField(
+        'Sum of review scores',
+        default=0,
+        editable=False
+    )
+    review_count = models.PositiveIntegerField(
+        'Number of reviews',
+        default=0,
+        editable=False
+    )
+    # Also moved by the review totals, which are part of the title.
+    updated_at = models.DateTimeField(
+        'Updated',
+        auto_now=True,
+        db_index=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Art work'
@@ -178,6 +252,24 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # The review totals are only changed through update_rating(),
+        # a plain save must not overwrite them with stale values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('score_sum', 'review_count')
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        """Average review score derived from the stored totals."""
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -187,18 +279,88 @@ class Review(models.Model):
         YaUser, on_delete=models.CASCADE, related_name='reviews')
     score = models.PositiveSmallIntegerField(
         validators=[
-            MaxValueValidator(10),
-            MinValueValidator(1)
+            MaxValueValidator(MAX_SCORE),
+            MinValueValidator(MIN_SCORE)
         ])
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ('title',)
         unique_together = [['title', 'author']]
+        indexes = [
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        # The title totals are updated by the post_save receiver,
+        # so both writes have to share one transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+@receiver(post_init, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    # Read __dict__ directly so deferred fields are not fetched here.
+    instance._counted = (
+        instance.__dict__.get('title_id'), instance.__dict__.get('score')
+    )
+
+
+@receiver([pre_save, pre_delete], sender=Review)
+def fetch_review_score(sender, instance, using, **kwargs):
+    # The row holds the values counted so far, which another request may
+    # have changed since this instance was loaded, or deferred. Lock it
+    # until the totals are updated in the same transaction; a row deleted
+    # meanwhile is counted no more.
+    if instance._state.adding:
+        return
+    instance._counted = sender._base_manager.using(using).select_for_update(
+    ).filter(pk=instance.pk).values_list('title_id', 'score').first() or (
+        None, None
+    )
+
+
+@receiver(post_save, sender=Review)
+def count_review_score(sender, instance, created, **kwargs):
+    old_title_id, old_score = instance._counted
+    added = (instance.title_id, instance.score, instance.pub_date, 1)
+    if not created and old_title_id is not None:
+        removed = (old_title_id, old_score, instance.pub_date, -1)
+        if old_title_id == instance.title_id:
+            if old_score != instance.score:
+                Title.objects.filter(pk=instance.title_id).update_rating(
+                    instance.score - old_score, 0
+                )
+                LeaderboardEntry.objects.rescore([instance.title_id])
+                roll_up_reviews([removed, added])
+            instance._counted = (instance.title_id, instance.score)
+            return
+        Title.objects.filter(pk=old_title_id).update_rating(-old_score, -1)
+        LeaderboardEntry.objects.review_removed(old_title_id)
+        roll_up_reviews([removed])
+    Title.objects.filter(pk=instance.title_id).update_rating(
+        instance.score, 1
+    )
+    LeaderboardEntry.objects.review_added(instance.title_id)
+    roll_up_reviews([added])
+    instance._counted = (instance.title_id, instance.score)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review_score(sender, instance, **kwargs):
+    old_title_id, old_score = instance._counted
+    if old_title_id is not None and old_score is not None:
+        Title.objects.filter(pk=old_title_id).update_rating(-old_score, -1)
+        LeaderboardEntry.objects.review_removed(old_title_id)
+        roll_up_reviews([(old_title_id, old_score, instance.pub_date, -1)])
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -208,6 +370,14 @@ class Comment(models.Model):
         YaUser, on_delete=models.CASCADE, related_name='comments')
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -219,3 +389,338 @@ class GenreTitle(models.Model):
 
     def __str__(self):
         return f'{self.title} {self.genre}'
+
+
+def weighted_rating():
+    """Average score of a title pulled toward LEADERBOARD_PRIOR_SCORE.
+
+    The prior weighs as much as LEADERBOARD_PRIOR_REVIEWS reviews, so a
+    title with a few reviews ranks close to it whatever their scores.
+    """
+    reviews = float(settings.LEADERBOARD_PRIOR_REVIEWS)
+    return ExpressionWrapper(
+        (
+            Cast('score_sum', FloatField())
+            + Value(reviews * settings.LEADERBOARD_PRIOR_SCORE, FloatField())
+        ) / (
+            Cast('review_count', FloatField()) + Value(reviews, FloatField())
+        ),
+        output_field=FloatField()
+    )
+
+
+def delete_title_rows(model, title_ids, using):
+    """Delete the rows of these titles, of all titles by default.
+
+    A plain DELETE: QuerySet.delete() would first fetch every row for the
+    post_delete receiver of api.signals, which only drops the cached
+    responses, and the callers put new rows in their place right away.
+    """
+    connection = connections[using]
+    sql = f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}'
+    with connection.cursor() as cursor:
+        if title_ids is None:
+            cursor.execute(sql)
+            return
+        column = connection.ops.quote_name(
+            model._meta.get_field('title').column
+        )
+        title_ids = list(title_ids)
+        # Within the 999 parameters SQLite takes in a query.
+        for start in range(0, len(title_ids), 500):
+            batch = title_ids[start:start + 500]
+            cursor.execute(
+                f'{sql} WHERE {column} IN ({", ".join(["%s"] * len(batch))})',
+                batch
+            )
+
+
+class LeaderboardQuerySet(models.QuerySet):
+
+    def refresh(self, title_ids=None):
+        """Rebuild the entries of these titles, of all titles by default.
+
+        Returns the number of titles on the leaderboards.
+        """
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            return self._refresh(title_ids, using)
+
+    def _refresh(self, title_ids, using):
+        entries = self.using(using)
+        titles = Title.objects.using(using).filter(review_count__gt=0)
+        if title_ids is not None:
+            entries = entries.filter(title_id__in=title_ids)
+            titles = titles.filter(pk__in=title_ids)
+        delete_title_rows(self.model, title_ids, using)
+        rated = list(titles.annotate(weighted=weighted_rating()).values_list(
+            'id', 'category_id', 'weighted'
+        ).iterator())
+        if not rated:
+            return 0
+        if title_ids is not None:
+            titles = [title_id for title_id, _, _ in rated]
+        genres = {}
+        links = Title.genre.through.objects.using(using).filter(
+            title_id__in=titles
+        ).values_list('title_id', 'genre_id')
+        for title_id, genre_id in links.iterator():
+            genres.setdefault(title_id, []).append(genre_id)
+        batch = []
+        for title_id, category_id, score in rated:
+            batch.append(self.model(title_id=title_id, score=score))
+            if category_id is not None:
+                batch.append(self.model(
+                    title_id=title_id, category_id=category_id, score=score
+                ))
+            batch.extend(
+                self.model(title_id=title_id, genre_id=genre_id, score=score)
+                for genre_id in genres.get(title_id, ())
+            )
+            if len(batch) >= 1000:
+                entries.bulk_create(batch)
+                batch = []
+        entries.bulk_create(batch)
+        return len(rated)
+
+    def rescore(self, title_ids):
+        """Update the scores of these titles from their review totals.
+
+        Returns the number of entries updated.
+        """
+        return self.filter(title_id__in=title_ids).update(score=Subquery(
+            Title.objects.filter(pk=OuterRef('title_id')).annotate(
+                weighted=weighted_rating()
+            ).values('weighted')[:1]
+        ))
+
+    def review_added(self, title_id):
+        if not self.rescore([title_id]):
+            # The first review of the title.
+            self.refresh([title_id])
+
+    def review_removed(self, title_id):
+        # Nothing is inserted here, the title may be deleted with its
+        # reviews right after.
+        self.filter(title_id=title_id, title__review_count=0).delete()
+        self.rescore([title_id])
+
+
+class LeaderboardEntry(models.Model):
+    """A reviewed title on the overall, category or genre leaderboard.
+
+    A title has an entry without category and genre, one with its
+    category and one per genre, all with its weighted rating. The
+    receivers below keep them in step with the reviews and the titles.
+    """
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='leaderboard_entries'
+    )
+    # Leads the ranking index, a separate one is not needed.
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, db_index=False,
+        related_name='leaderboard_entries'
+    )
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, null=True,
+        related_name='leaderboard_entries'
+    )
+    score = models.FloatField('Weighted rating')
+
+    objects = LeaderboardQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Leaderboard entry'
+        verbose_name_plural = 'Leaderboard entries'
+        indexes = [
+            models.Index(
+                fields=('category', 'genre', '-score', 'title'),
+                name='leaderboard_rank_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.title} {self.score:.2f}'
+
+
+@receiver(post_save, sender=Title)
+def move_title_entries(sender, instance, created, **kwargs):
+    # A new title has no reviews yet, a saved one may change category.
+    if not created:
+        LeaderboardEntry.objects.refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def move_genre_entries(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        # Only reviewed titles have entries, a new title has none.
+        if instance.leaderboard_entries.exists():
+            LeaderboardEntry.objects.refresh([instance.pk])
+    elif pk_set is None:
+        # The genre was cleared from all of its titles.
+        LeaderboardEntry.objects.filter(genre=instance).delete()
+    else:
+        LeaderboardEntry.objects.refresh(pk_set)
+
+
+def review_month(pub_date):
+    """First day of the month of a review, as TruncMonth() finds it."""
+    return timezone.localtime(pub_date).date().replace(day=1)
+
+
+class RollupQuerySet(models.QuerySet):
+    """Review counters of a title, one row per key.
+
+    Subclasses set key_fields, the fields of a review that make the key
+    of its row among title_id, score and month, and counters, the review
+    field that each counter of the row sums up or None to count reviews.
+    """
+    key_fields = ()
+    counters = {}
+
+    def add(self, key, values):
+        """Add to the counters of a row, created for a positive change."""
+        changes = {field: F(field) + value for field, value in values.items()}
+        if self.filter(**key).update(**changes) or min(values.values()) < 0:
+            return
+        # A row of zeros, unless a concurrent review has just created it.
+        self.bulk_create([self.model(**key)], ignore_conflicts=True)
+        self.filter(**key).update(**changes)
+
+    def count_reviews(self, changes):
+        """Apply (title_id, score, pub_date, sign) review changes.
+
+        Changes of the same row are summed up first, one query per row.
+        """
+        totals = {}
+        for title_id, score, pub_date, sign in changes:
+            review = {
+                'title_id': title_id, 'score': score,
+                'month': review_month(pub_date),
+            }
+            row = totals.setdefault(
+                tuple((field, review[field]) for field in self.key_fields), {}
+            )
+            for counter, field in self.counters.items():
+                row[counter] = row.get(counter, 0) + sign * (
+                    1 if field is None else review[field]
+                )
+        for key, values in totals.items():
+            if any(values.values()):
+                self.add(dict(key), values)
+
+    def from_reviews(self, reviews):
+        """The rows of these reviews, computed by the database."""
+        return reviews.annotate(
+            month=TruncMonth('pub_date', output_field=models.DateField())
+        ).values(*self.key_fields).annotate(**{
+            counter: Count('id') if field is None else Sum(field)
+            for counter, field in self.counters.items()
+        })
+
+    def rebuild(self, title_ids=None):
+        """Recount the rows of these titles, of all by default.
+
+        Returns the number of rows.
+        """
+        using = self._db or router.db_for_write(self.model)
+        rows = self.using(using)
+        reviews = Review.objects.using(using).order_by()
+        if title_ids is not None:
+            reviews = reviews.filter(title_id__in=title_ids)
+        count = 0
+        with transaction.atomic(using=using):
+            delete_title_rows(self.model, title_ids, using)
+            batch = []
+            for values in self.from_reviews(reviews).iterator():
+                batch.append(self.model(**values))
+                if len(batch) >= 1000:
+                    rows.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            rows.bulk_create(batch)
+        return count + len(batch)
+
+
+class ScoreCountQuerySet(RollupQuerySet):
+    key_fields = ('title_id', 'score')
+    counters = {'reviews': None}
+
+
+class MonthlyScoreQuerySet(RollupQuerySet):
+    key_fields = ('title_id', 'month')
+    counters = {'score_sum': 'score', 'review_count': None}
+
+
+class ScoreCount(models.Model):
+    """Number of reviews of a title with one score."""
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='score_counts'
+    )
+    score = models.PositiveSmallIntegerField()
+    reviews = models.PositiveIntegerField(default=0)
+
+    objects = ScoreCountQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [['title', 'score']]
+        verbose_name = 'Score count'
+        verbose_name_plural = 'Score counts'
+
+    def __str__(self):
+        return f'{self.title} {self.score}: {self.reviews}'
+
+
+class MonthlyScore(models.Model):
+    """Review totals of a title for the month its reviews were posted."""
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='monthly_scores'
+    )
+    month = models.DateField()
+    score_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+
+    objects = MonthlyScoreQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [['title', 'month']]
+        verbose_name = 'Monthly score'
+        verbose_name_plural = 'Monthly scores'
+
+    def __str__(self):
+        return f'{self.title} {self.month:%Y-%m}'
+
+
+def roll_up_reviews(changes):
+    """Apply (title_id, score, pub_date, sign) changes to the rollups."""
+    ScoreCount.objects.count_reviews(changes)
+    MonthlyScore.objects.count_reviews(changes)
+
+
+class OutgoingEmail(models.Model):
+    """Email waiting in the outbox for the send_emails command."""
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to_email = models.EmailField(max_length=254)
+    created_at = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('send_after', 'id')
+        verbose_name = 'Outgoing email'
+        verbose_name_plural = 'Outgoing emails'
+        indexes = [
+            models.Index(
+                fields=('send_after', 'id'),
+                name='outgoing_email_pending_idx',
+                condition=models.Q(sent_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to_email}'
@@ -0,0 +1,144 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from reviews.management.commands.export_data import FIELDS
+from reviews.management.commands.load_data import action, insert_batch
+from reviews.models import Category, Comment, Genre, Review, Title, YaUser
+
+
+class LoadDataTest(TestCase):
+
+    def load(self, *args):
+        call_command('load_data', *args, stdout=StringIO())
+
+    def test_load_all_files(self):
+        self.load('--batch-size', '7')
+        title = Title.objects.get(pk=1)
+        self.assertEqual((title.review_count, title.score_sum), (2, 20))
+        self.assertTrue(title.genre.exists())
+        self.assertEqual(
+            Review.objects.get(pk=1).pub_date.isoformat(),
+            '2019-09-24T21:08:21.567000+00:00'
+        )
+        counts = (Review.objects.count(), Comment.objects.count())
+        self.load()
+        self.assertEqual(
+            (Review.objects.count(), Comment.objects.count()), counts
+        )
+        YaUser.objects.create(username='new', email='new@yamdb.fake')
+
+    def test_upsert(self):
+        self.load('users.csv')
+        codes = dict(YaUser.objects.values_list('pk', 'confirmation_code'))
+        self.assertEqual(len(set(codes.values())), len(codes))
+        self.assertNotIn(None, codes.values())
+        YaUser.objects.filter(pk=100).update(role='admin', password='secret')
+        self.load('--upsert', 'users.csv')
+        user = YaUser.objects.get(pk=100)
+        self.assertEqual((user.role, user.password), ('user', 'secret'))
+        self.assertEqual(user.confirmation_code, codes[100])
+
+    def test_other_saves_keep_their_timestamps(self):
+        self.load('users.csv', 'category.csv', 'genre.csv', 'titles.csv')
+        title = Title.objects.get(pk=1)
+        author = YaUser.objects.create(username='new', email='new@yamdb.fake')
+
+        def insert_and_review(model, rows, upsert):
+            insert_batch(model, rows, upsert)
+            # Another request of the process, in the middle of the load.
+            review = Review.objects.create(
+                title=title, author=author, text='Отзыв', score=7
+            )
+            self.assertIsNotNone(review.pub_date)
+            review.delete()
+
+        with mock.patch(
+            'reviews.management.commands.load_data.insert_batch',
+            insert_and_review
+        ):
+            self.load('review.csv')
+        self.assertEqual(
+            Review.objects.get(pk=1).pub_date.isoformat(),
+            '2019-09-24T21:08:21.567000+00:00'
+        )
+
+
+class ExportDataTest(TestCase):
+
+    def snapshot(self):
+        return {
+            filename: list(model.objects.order_by('pk').values_list(
+                *FIELDS[filename]
+            ))
+            for filename, (model, _) in action.items()
+        }
+
+    def test_round_trip(self):
+        call_command('load_data', stdout=StringIO())
+        Title.objects.filter(pk=1).update(
+            description='Тюрьма, "надежда"\nи побег', category=None
+        )
+        YaUser.objects.filter(pk=100).update(
+            password=make_password('secret'), is_staff=True,
+            is_superuser=True, is_active=False
+        )
+        Review.objects.filter(pk=1).update(
+            pub_date=Review.objects.get(pk=1).pub_date.replace(
+                microsecond=123456
+            )
+        )
+        snapshot = self.snapshot()
+        ratings = list(Title.objects.order_by('pk').values_list(
+            'review_count', 'score_sum'
+        ))
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'export_data', '--path', directory, '--compress',
+                '--workers', '4', '--chunk-size', '7', stdout=StringIO()
+            )
+            self.assertCountEqual(
+                os.listdir(directory),
+                [f'{filename}.gz' for filename in action]
+            )
+            for model in (Category, Genre, Title, YaUser):
+                model.objects.all().delete()
+            self.assertFalse(Review.objects.exists())
+            call_command('load_data', '--path', directory, stdout=StringIO())
+        self.assertEqual(self.snapshot(), snapshot)
+        self.assertTrue(YaUser.objects.get(pk=100).check_password('secret'))
+        self.assertEqual(
+            list(Title.objects.order_by('pk').values_list(
+                'review_count', 'score_sum'
+            )),
+            ratings
+        )
+
+
+class GenerateDataTest(TestCase):
+
+    def test_insert_generated_dataset(self):
+        call_command(
+            'generate_data', '--insert', '--users', '20', '--titles', '30',
+            '--reviews', '200', '--comments', '100', stdout=StringIO()
+        )
+        self.assertEqual(YaUser.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 100)
+        popular, rare = Title.objects.get(pk=1), Title.objects.get(pk=30)
+        self.assertGreater(popular.review_count, rare.review_count)
+        self.assertEqual(
+            sum(Title.objects.values_list('review_count', flat=True)),
+            Review.objects.count()
+        )
+
+    def test_invalid_counts(self):
+        for option, value in (('--genres', '0'), ('--reviews', '-1')):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'generate_data', '--insert', option, value,
+                    stdout=StringIO()
+                )
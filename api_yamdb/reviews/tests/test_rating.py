@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from reviews.models import Category, Review, Title, YaUser
+
+
+class TitleRatingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        cls.title = Title.objects.create(
+            name='Крестный отец', year=1972, category=category
+        )
+        cls.users = [
+            YaUser.objects.create(
+                username=f'user{number}', email=f'user{number}@yamdb.fake'
+            )
+            for number in range(3)
+        ]
+
+    def review(self, user, score):
+        return Review.objects.create(
+            title=self.title, author=user, text='Отзыв', score=score
+        )
+
+    def assert_totals(self, score_sum, review_count):
+        self.title.refresh_from_db()
+        self.assertEqual(
+            (self.title.score_sum, self.title.review_count),
+            (score_sum, review_count)
+        )
+
+    def test_create_rescore_delete(self):
+        first = self.review(self.users[0], 10)
+        self.review(self.users[1], 5)
+        self.assert_totals(15, 2)
+        self.assertEqual(self.title.rating, 7.5)
+
+        first.score = 4
+        first.save()
+        first.save()
+        self.assert_totals(9, 2)
+
+        Review.objects.get(pk=first.pk).delete()
+        self.assert_totals(5, 1)
+
+    def test_deferred_score(self):
+        first = self.review(self.users[0], 10)
+        self.review(self.users[1], 6)
+        review = Review.objects.only('id', 'text').get(pk=first.pk)
+        review.score = 3
+        review.save()
+        self.assert_totals(9, 2)
+
+        Review.objects.defer('title', 'score').get(pk=first.pk).delete()
+        self.assert_totals(6, 1)
+
+    def test_stale_instances(self):
+        first = self.review(self.users[0], 10)
+        self.review(self.users[1], 6)
+        stale = Review.objects.get(pk=first.pk)
+        first.score = 5
+        first.save()
+        stale.score = 3
+        stale.save()
+        self.assert_totals(9, 2)
+
+        Review.objects.get(pk=first.pk).delete()
+        stale.delete()
+        self.assert_totals(6, 1)
+
+    def test_cascade_delete(self):
+        self.review(self.users[0], 8)
+        self.review(self.users[2], 2)
+        self.users[2].delete()
+        self.assert_totals(8, 1)
+
+    def test_title_save_keeps_totals(self):
+        stale = Title.objects.get(pk=self.title.pk)
+        self.review(self.users[0], 7)
+        stale.name = 'The Godfather'
+        stale.save()
+        self.assert_totals(7, 1)
+
+    def test_recount_ratings(self):
+        self.review(self.users[0], 6)
+        self.review(self.users[1], 9)
+        Title.objects.update(score_sum=0, review_count=0)
+        call_command('recount_ratings', stdout=StringIO())
+        self.assert_totals(15, 2)
+        self.assertEqual(Title.objects.recount_ratings(), 0)
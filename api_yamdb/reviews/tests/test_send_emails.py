@@ -0,0 +1,172 @@
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.management.commands.send_emails import pending
+from reviews.models import OutgoingEmail, YaUser
+
+
+class FlakyBackend(EmailBackend):
+    """Locmem backend that refuses some addresses and counts connections."""
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith('broken'):
+                raise ConnectionError('Mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class ObservingBackend(EmailBackend):
+    """Locmem backend noting how many emails are due while it sends."""
+    due = []
+    reachable = True
+
+    def open(self):
+        if not ObservingBackend.reachable:
+            raise ConnectionError('Connection refused')
+        return True
+
+    def send_messages(self, messages):
+        ObservingBackend.due.append(pending(5).count())
+        return super().send_messages(messages)
+
+
+@override_settings(THROTTLE_STORE='api.throttling.CacheBucketStore')
+class SendEmailsTest(TestCase):
+
+    def send(self, *args):
+        call_command('send_emails', *args, stdout=StringIO())
+
+    def queue(self, *addresses):
+        for address in addresses:
+            OutgoingEmail.objects.create(
+                subject='Тема', body='Текст', to_email=address
+            )
+
+    def test_signup_only_queues_the_code(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = APIClient().post(
+                '/api/v1/auth/signup/',
+                {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+            )
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query['sql'].split()[0] for query in captured
+            if not query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))
+        ]
+        self.assertEqual(writes, ['INSERT', 'INSERT'])
+        code = YaUser.objects.get(username='newbie').confirmation_code
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to_email, 'newbie@yamdb.fake')
+
+        self.send()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(f'code for our API: {code}', mail.outbox[0].body)
+        self.assertIsNotNone(OutgoingEmail.objects.get().sent_at)
+        self.send()
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='reviews.tests.test_send_emails.FlakyBackend'
+    )
+    def test_one_connection_per_batch(self):
+        FlakyBackend.opened = 0
+        self.queue(*(f'user{number}@yamdb.fake' for number in range(5)))
+        self.send('--batch-size', '2')
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(FlakyBackend.opened, 3)
+
+    @override_settings(
+        EMAIL_BACKEND='reviews.tests.test_send_emails.FlakyBackend'
+    )
+    def test_failures_are_retried_with_backoff(self):
+        self.queue('broken@yamdb.fake', 'fine@yamdb.fake')
+        started = timezone.now()
+        self.send('--backoff', '60')
+        self.assertEqual(len(mail.outbox), 1)
+        broken = OutgoingEmail.objects.get(to_email='broken@yamdb.fake')
+        self.assertEqual(broken.attempts, 1)
+        self.assertIn('Mailbox unavailable', broken.last_error)
+        self.assertGreaterEqual(
+            (broken.send_after - started).total_seconds(), 60
+        )
+
+        self.send()
+        self.assertEqual(
+            OutgoingEmail.objects.get(pk=broken.pk).attempts, 1
+        )
+
+        for _ in range(4):
+            OutgoingEmail.objects.filter(pk=broken.pk).update(
+                send_after=timezone.now()
+            )
+            self.send('--max-attempts', '3')
+        broken.refresh_from_db()
+        self.assertEqual(broken.attempts, 3)
+        self.assertIsNone(broken.sent_at)
+
+    @override_settings(
+        EMAIL_BACKEND='reviews.tests.test_send_emails.ObservingBackend'
+    )
+    def test_claimed_batch_leaves_the_queue(self):
+        ObservingBackend.due = []
+        self.queue('first@yamdb.fake', 'second@yamdb.fake')
+        self.send()
+        # Another worker finds nothing to send while the batch is out.
+        self.assertEqual(ObservingBackend.due, [0, 0])
+
+        self.queue('third@yamdb.fake')
+        ObservingBackend.reachable = False
+        try:
+            with self.assertRaises(ConnectionError):
+                self.send()
+        finally:
+            ObservingBackend.reachable = True
+        email = OutgoingEmail.objects.get(to_email='third@yamdb.fake')
+        self.assertEqual(list(pending(5)), [email])
+        self.assertEqual(email.attempts, 0)
+
+    @override_settings(
+        EMAIL_BACKEND='reviews.tests.test_send_emails.ObservingBackend'
+    )
+    def test_loop_outlives_the_mail_server(self):
+        self.queue('first@yamdb.fake')
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            ObservingBackend.reachable = True
+            if len(waits) == 2:
+                raise KeyboardInterrupt
+
+        ObservingBackend.reachable = False
+        errors = StringIO()
+        try:
+            with mock.patch(
+                'reviews.management.commands.send_emails.time.sleep', sleep
+            ), self.assertRaises(KeyboardInterrupt):
+                call_command(
+                    'send_emails', '--loop', '--interval', '5',
+                    stdout=StringIO(), stderr=errors
+                )
+        finally:
+            ObservingBackend.reachable = True
+        # Backed off after the error, then polled the empty outbox.
+        self.assertEqual(waits, [10, 5])
+        self.assertIn('Connection refused', errors.getvalue())
+        email = OutgoingEmail.objects.get()
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(email.attempts, 1)